@@ -8,6 +8,9 @@ import random
 import numpy as np
 from typing import Dict, List, Tuple, Any
 
+# Plural suffix for "child", indexed by (children_count != 1); service.py imports it too
+CHILD_SUFFIXES = ("", "ren")
+
 class NLGRecommendationEngine:
     """Natural Language Generation engine for counseling recommendations"""
     
@@ -226,7 +229,7 @@ class NLGRecommendationEngine:
             
             if score > 0.7:
                 if has_children:
-                    return f"Your responses indicate significant concerns about responsible parenthood ({int(score * 100)}% priority), particularly important given your experience with {children_count} child{'ren' if children_count > 1 else ''}. Intensive parenting counseling would be highly beneficial to address these concerns."
+                    return f"Your responses indicate significant concerns about responsible parenthood ({int(score * 100)}% priority), particularly important given your experience with {children_count} child{CHILD_SUFFIXES[children_count != 1]}. Intensive parenting counseling would be highly beneficial to address these concerns."
                 else:
                     return f"Your responses show significant concerns about responsible parenthood ({int(score * 100)}% priority). This suggests the need for comprehensive parenting preparation and education before starting a family."
             else:
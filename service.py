@@ -7,17 +7,31 @@ Uses Random Forest models for couple counseling risk assessment and recommendati
 
 import os
 import json
+import glob
+import logging
+import hashlib
 import pickle
+import queue
 import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+import joblib
+from collections import ChainMap
+from itertools import groupby
+from operator import itemgetter
+from types import MappingProxyType
 import numpy as np
-import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from nlg_recommendation_engine import CHILD_SUFFIXES
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingClassifier
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
-from sklearn.metrics import accuracy_score, mean_squared_error
-from sklearn.multioutput import MultiOutputRegressor
+from sklearn.model_selection import GridSearchCV, cross_val_score
 from sklearn.utils import class_weight
 
 # Import imbalanced-learn with error handling
@@ -31,12 +45,110 @@ except ImportError as e:
     SMOTE = None  # type: ignore
     SMOTETomek = None  # type: ignore
     print(f"Warning: imbalanced-learn not available. SMOTE features will be disabled. Error: {e}")
+
+# Import numba with error handling (JIT kernel for per-request feature computation)
+try:
+    from numba import njit, types  # type: ignore
+    NUMBA_AVAILABLE = True
+    print("[OK] numba imported successfully - JIT feature kernel enabled")
+except ImportError as e:
+    NUMBA_AVAILABLE = False
+    njit = None  # type: ignore
+    types = None  # type: ignore
+    print(f"Warning: numba not available. Using NumPy feature computation. Error: {e}")
+
+# Import ONNX converter/runtime with error handling (compiled tree inference)
+try:
+    import onnxruntime as ort  # type: ignore
+    from skl2onnx import convert_sklearn  # type: ignore
+    from skl2onnx.common.data_types import FloatTensorType  # type: ignore
+    ONNX_AVAILABLE = True
+    print("[OK] onnxruntime/skl2onnx imported successfully - ONNX inference enabled")
+except ImportError as e:
+    ONNX_AVAILABLE = False
+    ort = None  # type: ignore
+    convert_sklearn = None  # type: ignore
+    FloatTensorType = None  # type: ignore
+    print(f"Warning: onnxruntime/skl2onnx not available. Using scikit-learn predict. Error: {e}")
+
+# Import treelite with error handling (risk model compiled to a native shared library)
+try:
+    import treelite  # type: ignore
+    import treelite_runtime  # type: ignore
+    TREELITE_AVAILABLE = True
+    print("[OK] treelite imported successfully - native risk model enabled")
+except ImportError as e:
+    TREELITE_AVAILABLE = False
+    treelite = None  # type: ignore
+    treelite_runtime = None  # type: ignore
+    print(f"Warning: treelite not available. Native risk model will be disabled. Error: {e}")
+
+# Import DBUtils with error handling (pooled database connections)
+try:
+    from dbutils.pooled_db import PooledDB  # type: ignore
+    DBUTILS_AVAILABLE = True
+    print("[OK] DBUtils imported successfully - database connection pooling enabled")
+except ImportError as e:
+    DBUTILS_AVAILABLE = False
+    PooledDB = None  # type: ignore
+    print(f"Warning: DBUtils not available. Database connections will not be pooled. Error: {e}")
+
+# Import orjson with error handling (fast JSON responses with native NumPy support)
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+    # NumPy arrays/scalars allowed, keys sorted like jsonify
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    print("[OK] orjson imported successfully - fast JSON responses enabled")
+except ImportError as e:
+    ORJSON_AVAILABLE = False
+    orjson = None  # type: ignore
+    ORJSON_OPTIONS = None
+    print(f"Warning: orjson not available. Using the standard json module. Error: {e}")
+
+# Import gunicorn with error handling (preforked production server for `python service.py`; Unix only)
+try:
+    from gunicorn.app.base import BaseApplication  # type: ignore
+    GUNICORN_AVAILABLE = True
+    print("[OK] gunicorn imported successfully - production server enabled")
+except ImportError as e:
+    GUNICORN_AVAILABLE = False
+    BaseApplication = None  # type: ignore
+    print(f"Warning: gunicorn not available. Using the Flask development server. Error: {e}")
 import warnings
 warnings.filterwarnings('ignore')
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that parses request bodies with orjson; responses are serialized by ojsonify"""
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 CORS(app)
 
+def json_default(obj):
+    """Convert NumPy arrays/scalars for the stdlib json fallback of ojsonify"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def ojsonify(obj):
+    """jsonify replacement serialized by orjson with ORJSON_OPTIONS"""
+    if not ORJSON_AVAILABLE:
+        return app.response_class(
+            json.dumps(obj, default=json_default, sort_keys=True, separators=(',', ':')) + '\n',
+            mimetype='application/json'
+        )
+    return app.response_class(
+        orjson.dumps(obj, option=ORJSON_OPTIONS),
+        mimetype='application/json'
+    )
+
 # Ensure MEAI questions are loaded on app startup (for Heroku/gunicorn)
 @app.before_request
 def ensure_questions_loaded():
@@ -106,17 +218,156 @@ def get_db_config():
         'charset': 'utf8mb4'
     }
 
+# Shared pymysql connection pool, created on first use (see get_db_connection)
+db_pool = None
+db_pool_lock = threading.Lock()
+
+def get_db_connection():
+    """Get a database connection, from the shared pool when DBUtils is available (close() returns it)"""
+    global db_pool
+    import pymysql
+    
+    if not DBUTILS_AVAILABLE:
+        return pymysql.connect(**get_db_config())
+    
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = PooledDB(creator=pymysql, mincached=1, maxcached=4, **get_db_config())
+    return db_pool.connection()
+
+# Disk snapshots of the MEAI categories/questions, keyed by the source tables' checksum
+METADATA_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+def get_tables_version(cursor, tables):
+    """Short hash of CHECKSUM TABLE for the given tables (None if unavailable, which disables the snapshot)"""
+    try:
+        cursor.execute(f"CHECKSUM TABLE {', '.join(tables)}")
+        rows = cursor.fetchall()
+    except Exception as e:
+        print(f"Warning: could not checksum {', '.join(tables)}: {e}")
+        return None
+    
+    if not rows or any(row[1] is None for row in rows):
+        return None
+    return hashlib.sha1(repr(sorted(rows)).encode()).hexdigest()[:16]
+
+def load_metadata_snapshot(name, version):
+    """Load the pickled snapshot for this table version, or None if missing/unreadable"""
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(METADATA_CACHE_DIR, f'{name}_{version}.pkl'), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+def save_metadata_snapshot(name, version, data):
+    """Write the snapshot for this table version and drop snapshots of older versions"""
+    if version is None:
+        return
+    path = os.path.join(METADATA_CACHE_DIR, f'{name}_{version}.pkl')
+    try:
+        os.makedirs(METADATA_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        for old_path in glob.glob(os.path.join(METADATA_CACHE_DIR, f'{name}_*.pkl')):
+            if old_path != path:
+                os.remove(old_path)
+    except OSError as e:
+        print(f"Warning: could not write {name} snapshot: {e}")
+
+# Questionnaire response codes accepted by /analyze and /predict_batch (1-5 scale)
+RESPONSE_CODE_MIN, RESPONSE_CODE_MAX = 1, 5
+RESPONSE_CODES = RESPONSE_CODE_MAX + 1
+
+# Conflict weight per (male, female) response pair, indexed by male * RESPONSE_CODES + female:
+# 1.0 if either partner disagrees (2) or the responses differ by 2+, 0.5 if they differ by 1, else 0.0
+CONFLICT_PAIR_MALE, CONFLICT_PAIR_FEMALE = np.divmod(np.arange(RESPONSE_CODES * RESPONSE_CODES), RESPONSE_CODES)
+CONFLICT_LUT = np.where(
+    (CONFLICT_PAIR_MALE == 2) | (CONFLICT_PAIR_FEMALE == 2) | (np.abs(CONFLICT_PAIR_MALE - CONFLICT_PAIR_FEMALE) >= 2), 1.0,
+    np.where(np.abs(CONFLICT_PAIR_MALE - CONFLICT_PAIR_FEMALE) == 1, 0.5, 0.0)
+).astype(np.float32)
+
+def personalized_features_kernel(male_responses, female_responses, question_cat_ids, category_sums, category_counts):
+    """Single pass over both partners' responses; accumulates per-category alignment into category_sums/category_counts
+    (indexed by category_id - 1) and returns (alignment_sum, weighted_conflict_sum, neutral_count)"""
+    alignment_sum = 0.0
+    weighted_conflict_sum = 0.0
+    neutral_count = 0.0
+    
+    for i in range(male_responses.shape[0]):
+        male_resp = male_responses[i]
+        female_resp = female_responses[i]
+        
+        # Calculate alignment (how close their responses are)
+        difference = abs(male_resp - female_resp)
+        question_alignment = (4 - difference) / 4  # 0-1 scale
+        alignment_sum += question_alignment
+        
+        # Category-specific alignment (question_cat_ids holds the category of each response position)
+        if i < question_cat_ids.shape[0]:
+            category_index = question_cat_ids[i] - 1
+            if 0 <= category_index < category_sums.shape[0]:
+                category_sums[category_index] += question_alignment
+                category_counts[category_index] += 1.0
+        
+        # Count conflicts using same logic as actual_disagree_ratio (table lookup instead of branches)
+        weighted_conflict_sum += CONFLICT_LUT[male_resp * RESPONSE_CODES + female_resp]
+        
+        if male_resp == 3 or female_resp == 3:
+            neutral_count += 1.0
+    
+    return alignment_sum, weighted_conflict_sum, neutral_count
+
+if NUMBA_AVAILABLE:
+    # Explicit signature compiles eagerly at import, ahead of the first request (cached on disk between restarts)
+    personalized_features_kernel = njit(
+        types.UniTuple(types.float64, 3)(types.int8[::1], types.int8[::1], types.int8[::1], types.float64[::1], types.float64[::1]),
+        cache=True, fastmath=True
+    )(personalized_features_kernel)
+
+def disagreement_counts_kernel(male_responses, female_responses):
+    """Single pass over both partners' responses for the /analyze disagreement ratio;
+    returns (question_disagree_count, partner_disagree_count, neutral_count)"""
+    question_disagree_count = 0.0
+    partner_disagree_count = 0.0
+    neutral_count = 0.0
+    
+    for i in range(male_responses.shape[0]):
+        male_resp = male_responses[i]
+        female_resp = female_responses[i]
+        
+        # Either partner disagrees with the question
+        if male_resp == 2 or female_resp == 2:
+            question_disagree_count += 1.0
+        
+        # Partners disagree with each other (significant = 1, minor = 0.5)
+        difference = abs(male_resp - female_resp)
+        if difference >= 2:
+            partner_disagree_count += 1.0
+        elif difference == 1:
+            partner_disagree_count += 0.5
+        
+        if male_resp == 3 or female_resp == 3:
+            neutral_count += 1.0
+    
+    return question_disagree_count, partner_disagree_count, neutral_count
+
+if NUMBA_AVAILABLE:
+    disagreement_counts_kernel = njit(
+        types.UniTuple(types.float64, 3)(types.int8[::1], types.int8[::1]),
+        cache=True, fastmath=True
+    )(disagreement_counts_kernel)
+
 def calculate_personalized_features_flask(questionnaire_responses, male_responses, female_responses):
     """Calculate personalized features in Flask service when not provided by PHP API"""
     
     # If we have separate male/female responses, use them
-    if male_responses and female_responses and len(male_responses) > 0 and len(female_responses) > 0:
-        # Use the separate responses
-        all_responses = male_responses + female_responses
-    else:
+    if not (male_responses and female_responses and len(male_responses) > 0 and len(female_responses) > 0):
         # questionnaire_responses should be a flat array of all responses
         # We need to split them properly - the PHP API should ideally send them separately
-        all_responses = questionnaire_responses
         
         # Since we don't have separate male/female responses, we need to calculate them
         # This is a fallback - the PHP API should ideally send them separately
@@ -128,88 +379,57 @@ def calculate_personalized_features_flask(questionnaire_responses, male_response
             male_responses = questionnaire_responses
             female_responses = questionnaire_responses
     
-    # Calculate overall alignment score
-    alignment_score = 0
-    conflict_count = 0
-    weighted_conflict_sum = 0.0
+    # Work on the overlapping prefix of both partners' responses as NumPy vectors
     total_questions = min(len(male_responses), len(female_responses))
     
-    for i in range(total_questions):
-        male_resp = male_responses[i] if i < len(male_responses) else 3
-        female_resp = female_responses[i] if i < len(female_responses) else 3
+    if NUMBA_AVAILABLE:
+        male = np.ascontiguousarray(male_responses[:total_questions], dtype=np.int8)
+        female = np.ascontiguousarray(female_responses[:total_questions], dtype=np.int8)
+        category_sums = np.zeros(len(MEAI_CATEGORIES), dtype=np.float64)
+        category_counts = np.zeros(len(MEAI_CATEGORIES), dtype=np.float64)
+        alignment_sum, weighted_conflict_sum, neutral_count = personalized_features_kernel(
+            male, female, QUESTION_CAT_IDS, category_sums, category_counts
+        )
+        alignment_score = alignment_sum / total_questions if total_questions > 0 else 0.5
         
-        # Calculate alignment (how close their responses are)
-        difference = abs(male_resp - female_resp)
-        alignment_score += (4 - difference) / 4  # 0-1 scale
+        # NEW: Category-specific alignment scores (4 features, one per MEAI category; 0.5 if no questions)
+        category_alignments = np.where(category_counts > 0, category_sums / np.maximum(category_counts, 1.0), 0.5).tolist()
+    else:
+        male = np.asarray(male_responses[:total_questions], dtype=np.int8)
+        female = np.asarray(female_responses[:total_questions], dtype=np.int8)
+        
+        # Calculate alignment per question (how close their responses are, 0-1 scale)
+        difference = np.abs(male - female)
+        question_alignment = (4 - difference) / 4
+        alignment_score = float(question_alignment.mean()) if total_questions > 0 else 0.5
         
         # Count conflicts using same logic as actual_disagree_ratio
         # This ensures conflict_ratio matches the disagreement calculation
-        question_disagree = 1 if (male_resp == 2 or female_resp == 2) else 0
-        if difference >= 2:
-            partner_disagree = 1.0
-        elif difference == 1:
-            partner_disagree = 0.5
-        else:
-            partner_disagree = 0.0
+        pair_index = male * RESPONSE_CODES + female
+        weighted_conflict_sum = float(CONFLICT_LUT[pair_index].sum())
+        neutral_count = int(((male == 3) | (female == 3)).sum())
         
-        # Use max to avoid double counting (same as actual_disagree_ratio)
-        weighted_conflict_sum += max(question_disagree, partner_disagree)
+        # NEW: Category-specific alignment scores (4 features, one per MEAI category)
+        category_alignments = []
+        for category_id in range(1, len(MEAI_CATEGORIES) + 1):
+            # Response indices for this category (qid is 1-indexed, responses are 0-indexed)
+            resp_idx = CAT_QID_ARRAYS.get(category_id)
+            
+            if resp_idx is None:
+                category_alignments.append(0.5)  # Default if no questions
+                continue
+            
+            # Calculate alignment for questions in this category only
+            resp_idx = resp_idx[resp_idx < total_questions]
+            category_alignment = float(question_alignment[resp_idx].mean()) if len(resp_idx) > 0 else 0.5
+            category_alignments.append(category_alignment)
     
-    alignment_score = alignment_score / total_questions if total_questions > 0 else 0.5
     # Add weighted neutrals (30% weight) to match actual_disagree_ratio
-    neutral_count = sum(1 for i in range(total_questions) 
-                       if (male_responses[i] == 3 or female_responses[i] == 3))
     conflict_ratio = ((weighted_conflict_sum + (neutral_count * 0.3)) / total_questions) if total_questions > 0 else 0
     
-    # Calculate partner averages
-    male_avg = sum(male_responses) / len(male_responses) if male_responses else 3.0
-    female_avg = sum(female_responses) / len(female_responses) if female_responses else 3.0
-    
-    # NEW: Category-specific alignment scores (4 features, one per MEAI category)
-    category_alignments = []
-    for category_id in range(1, len(MEAI_CATEGORIES) + 1):
-        # Get question IDs for this category
-        category_question_ids = [qid for qid, cid in MEAI_QUESTION_MAPPING.items() if cid == category_id]
-        
-        if not category_question_ids:
-            category_alignments.append(0.5)  # Default if no questions
-            continue
-        
-        # Calculate alignment for questions in this category only
-        category_alignment = 0
-        category_question_count = 0
-        
-        for qid in category_question_ids:
-            # Find response index (qid is 1-indexed, responses are 0-indexed)
-            resp_idx = qid - 1
-            if resp_idx < len(male_responses) and resp_idx < len(female_responses):
-                male_resp = male_responses[resp_idx]
-                female_resp = female_responses[resp_idx]
-                difference = abs(male_resp - female_resp)
-                category_alignment += (4 - difference) / 4
-                category_question_count += 1
-        
-        category_alignment = category_alignment / category_question_count if category_question_count > 0 else 0.5
-        category_alignments.append(category_alignment)
-    
-    # NEW: Extreme response counts (4 features)
-    male_agree_count = sum(1 for r in male_responses if r == 4)  # Agree = 4
-    male_disagree_count = sum(1 for r in male_responses if r == 2)  # Disagree = 2
-    female_agree_count = sum(1 for r in female_responses if r == 4)
-    female_disagree_count = sum(1 for r in female_responses if r == 2)
-    
-    # Convert to ratios for better scaling
-    total_male = len(male_responses) if male_responses else 1
-    total_female = len(female_responses) if female_responses else 1
-    male_agree_ratio = male_agree_count / total_male
-    male_disagree_ratio = male_disagree_count / total_male
-    female_agree_ratio = female_agree_count / total_female
-    female_disagree_ratio = female_disagree_count / total_female
-    
     return {
         'alignment_score': alignment_score,
         'conflict_ratio': conflict_ratio,
-        'total_conflicts': conflict_count,
         # Category-specific alignments (4 features, one per MEAI category)
         'category_alignments': category_alignments
         # REMOVED: male_avg_response, female_avg_response, male_agree_ratio, male_disagree_ratio, female_agree_ratio, female_disagree_ratio
@@ -222,6 +442,41 @@ ml_models = {
     'risk_encoder': None
 }
 
+# NEW: True once every entry in ml_models is set (kept current by update_models_ready)
+MODELS_READY = False
+
+def update_models_ready():
+    """Recompute MODELS_READY after ml_models changes"""
+    global MODELS_READY
+    MODELS_READY = all(model is not None for model in ml_models.values())
+
+# ONNX inference sessions for the sklearn models above (None = use sklearn predict)
+onnx_sessions = {
+    'risk_model': None,
+    'category_model': None
+}
+
+# Treelite predictors compiled from the sklearn models (None = use ONNX/sklearn predict)
+# Only the risk model: treelite cannot import the multi-output category forest
+native_predictors = {
+    'risk_model': None
+}
+
+# Row count from which predict_risk prefers the treelite library over the ONNX session
+# (treelite's per-call DMatrix setup costs more than ONNX on 1-row inputs, less on batches)
+SMALL_BATCH_ROWS = 8
+
+# Threads that run the scikit-learn category forest alongside the risk model (tree traversal releases the GIL)
+prediction_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='category-predict')
+
+# Micro-batching of /analyze predictions: rows queued by concurrent requests are predicted with one call per model
+# (a lone request is predicted immediately; the window only applies once other rows are already waiting)
+PREDICT_BATCH_MAX = 64
+PREDICT_BATCH_WINDOW_MS = 3
+prediction_queue = queue.Queue()
+prediction_batcher = None  # Worker thread, started on first use (and again in a forked worker process)
+prediction_batcher_lock = threading.Lock()
+
 # Training status tracking
 training_status = {
     'in_progress': False,
@@ -232,6 +487,12 @@ training_status = {
 }
 training_lock = threading.Lock()
 
+# Upper bound on couples accepted by /predict_batch in a single request
+MAX_BATCH_COUPLES = 100
+
+# Per-thread float32 feature row reused by /analyze (see get_feature_buffer)
+feature_buffers = threading.local()
+
 # MEAI Categories - dynamically loaded from database question_category table
 # These 4 categories are used for ML predictions and recommendations
 MEAI_CATEGORIES = []
@@ -239,6 +500,24 @@ MEAI_CATEGORIES = []
 # MEAI Questions and Sub-questions - dynamically loaded from database
 MEAI_QUESTIONS = {}  # {category_id: {question_id: {text, sub_questions: []}}}
 MEAI_QUESTION_MAPPING = {}  # {question_id: category_id}
+CATEGORY_MASK = np.zeros((0, 0), dtype=np.float32)  # (category_id - 1, response index) one-hot membership
+
+# Flat view of the answerable items (standalone questions + sub-questions) in response order
+QUESTION_CAT_IDS = np.zeros(0, dtype=np.int8)  # category_id per answerable item
+CAT_QID_ARRAYS = {}  # {category_id: 0-based response indices}, for fancy-indexing response arrays
+
+# NEW: Read-only defaults behind couple profiles (ChainMap(couple_profile, PROFILE_DEFAULTS) fills missing fields)
+PROFILE_DEFAULTS = MappingProxyType({
+    'male_age': 30,
+    'female_age': 30,
+    'civil_status': 'Single',
+    'years_living_together': 0,
+    'past_children': False,
+    'children': 0,
+    'education_level': 2,
+    'income_level': 2,
+    'employment_status': 'Unemployed',
+})
 
 # ============================================================================
 # DATA VALIDATION FUNCTIONS
@@ -288,17 +567,9 @@ def validate_couple_data(couple_profile, questionnaire_responses, male_responses
         received_count = len(questionnaire_responses)
         
         if MEAI_QUESTIONS and len(MEAI_QUESTIONS) > 0:
-            expected_count = 0
-            total_questions_in_structure = 0
-            for cat_id, cat_questions in MEAI_QUESTIONS.items():
-                for q_id, q_data in cat_questions.items():
-                    total_questions_in_structure += 1
-                    if q_data.get('sub_questions') and len(q_data['sub_questions']) > 0:
-                        # Question has sub-questions, count only the sub-questions
-                        expected_count += len(q_data['sub_questions'])
-                    elif not q_data.get('sub_questions') or len(q_data.get('sub_questions', [])) == 0:
-                        # Standalone question, count it
-                        expected_count += 1
+            # Answerable items: sub-questions, or the question itself when standalone
+            expected_count = len(QUESTION_CAT_IDS)
+            total_questions_in_structure = sum(len(cat_questions) for cat_questions in MEAI_QUESTIONS.values())
             print(f"DEBUG - MEAI_QUESTIONS: {len(MEAI_QUESTIONS)} categories, {total_questions_in_structure} questions, {expected_count} answerable items")
             print(f"DEBUG - Calculated expected_count from MEAI_QUESTIONS: {expected_count}")
             
@@ -373,6 +644,11 @@ def validate_couple_data(couple_profile, questionnaire_responses, male_responses
         'warnings': warnings
     }
 
+def first_invalid_response_index(responses):
+    """Index of the first response that is not an integer code in RESPONSE_CODE_MIN..RESPONSE_CODE_MAX, or None"""
+    return next((i for i, r in enumerate(responses)
+                 if type(r) is not int or not RESPONSE_CODE_MIN <= r <= RESPONSE_CODE_MAX), None)
+
 def validate_training_data(X, y_risk, y_categories):
     """Validate training data before model training"""
     errors = []
@@ -436,13 +712,20 @@ def load_categories_from_db():
     """Load MEAI categories from database question_category table"""
     global MEAI_CATEGORIES
     try:
-        import pymysql
-        
-        # Database connection - Auto-detect local vs remote
-        db_config = get_db_config()
-        conn = pymysql.connect(**db_config)
+        # Database connection - Auto-detect local vs remote (pooled)
+        conn = get_db_connection()
         
         cursor = conn.cursor()
+        
+        # Reuse the disk snapshot while question_category is unchanged
+        version = get_tables_version(cursor, ['question_category'])
+        cached_categories = load_metadata_snapshot('categories', version)
+        if cached_categories is not None:
+            MEAI_CATEGORIES = cached_categories
+            conn.close()
+            print(f"Loaded {len(MEAI_CATEGORIES)} MEAI categories from snapshot")
+            return True
+        
         cursor.execute("SELECT category_name FROM question_category ORDER BY category_id ASC")
         rows = cursor.fetchall()
         
@@ -464,6 +747,7 @@ def load_categories_from_db():
                 MEAI_CATEGORIES.append(full_name.title())
         
         conn.close()
+        save_metadata_snapshot('categories', version, MEAI_CATEGORIES)
         print(f"Loaded {len(MEAI_CATEGORIES)} MEAI categories from database")
         return True
     except Exception as e:
@@ -482,14 +766,21 @@ def load_questions_from_db():
     """Load MEAI questions and sub-questions from database"""
     global MEAI_QUESTIONS, MEAI_QUESTION_MAPPING
     try:
-        import pymysql
-        
-        # Database connection - Auto-detect local vs remote
-        db_config = get_db_config()
-        conn = pymysql.connect(**db_config)
+        # Database connection - Auto-detect local vs remote (pooled)
+        conn = get_db_connection()
         
         cursor = conn.cursor()
         
+        # Reuse the disk snapshot while the question tables are unchanged
+        version = get_tables_version(cursor, ['question_assessment', 'sub_question_assessment'])
+        cached_questions = load_metadata_snapshot('questions', version)
+        if cached_questions is not None:
+            MEAI_QUESTIONS, MEAI_QUESTION_MAPPING = cached_questions
+            conn.close()
+            build_question_index()
+            print(f"Loaded {len(QUESTION_CAT_IDS)} answerable questions from snapshot")
+            return True
+        
         # Load questions with sub-questions
         query = """
         SELECT 
@@ -543,27 +834,15 @@ def load_questions_from_db():
                     question_counter += 1
         
         conn.close()
+        save_metadata_snapshot('questions', version, (MEAI_QUESTIONS, MEAI_QUESTION_MAPPING))
+        build_question_index()
         
         # Count answerable questions only (standalone main questions + sub-questions)
-        total_answerable_questions = 0
-        for cat_questions in MEAI_QUESTIONS.values():
-            for q in cat_questions.values():
-                if q['sub_questions']:
-                    # Question has sub-questions, count only the sub-questions
-                    total_answerable_questions += len(q['sub_questions'])
-                else:
-                    # Standalone question, count it
-                    total_answerable_questions += 1
+        total_answerable_questions = len(QUESTION_CAT_IDS)
         
         print(f"Loaded {total_answerable_questions} answerable questions from database")
         print(f"Questions by category:")
-        for cat_id, cat_questions in MEAI_QUESTIONS.items():
-            answerable_count = 0
-            for q in cat_questions.values():
-                if q['sub_questions']:
-                    answerable_count += len(q['sub_questions'])
-                else:
-                    answerable_count += 1
+        for cat_id, answerable_count in zip(*np.unique(QUESTION_CAT_IDS, return_counts=True)):
             print(f"  Category {cat_id}: {answerable_count} answerable questions")
         
         return True
@@ -578,457 +857,389 @@ def load_questions_from_db():
             4: {4: {'text': 'Maternal Neonatal Child Health Question', 'sub_questions': []}}
         }
         MEAI_QUESTION_MAPPING = {1: 1, 2: 2, 3: 3, 4: 4}
+        build_question_index()
         print("Using fallback question structure")
         return False
 
+def build_question_index():
+    """Rebuild the flat question arrays and CATEGORY_MASK from MEAI_QUESTIONS / MEAI_QUESTION_MAPPING"""
+    global QUESTION_CAT_IDS, CATEGORY_MASK, CAT_QID_ARRAYS
+    category_ids = []
+    for cat_id, cat_questions in MEAI_QUESTIONS.items():
+        for q_data in cat_questions.values():
+            # Sub-questions are the answerable items; a standalone question answers itself
+            category_ids.extend([cat_id] * len(q_data['sub_questions'] or [q_data['text']]))
+    
+    QUESTION_CAT_IDS = np.array(category_ids, dtype=np.int8)
+    
+    # question_id is 1-indexed, responses are 0-indexed
+    num_categories = max([len(MEAI_CATEGORIES), *MEAI_QUESTION_MAPPING.values()], default=0)
+    CATEGORY_MASK = np.zeros((num_categories, max(MEAI_QUESTION_MAPPING, default=0)), dtype=np.float32)
+    category_to_qids = {}  # {category_id: [question_id, ...]}, inverse of MEAI_QUESTION_MAPPING
+    for qid, cid in MEAI_QUESTION_MAPPING.items():
+        CATEGORY_MASK[cid - 1, qid - 1] = 1.0
+        category_to_qids.setdefault(cid, []).append(qid)
+    CAT_QID_ARRAYS = {cid: np.array(qids, dtype=np.int32) - 1 for cid, qids in category_to_qids.items()}
+
+# Synthetic data is built column-wise; risk levels are stored as codes into RISK_LEVELS
+CIVIL_STATUS_OPTIONS = ['Single', 'Living In', 'Separated', 'Divorced', 'Widowed']
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+# Ranges of the synthetic personalized training features per risk code (rows: Low, Medium, High)
+# Columns: alignment_score, conflict_ratio, then the 4 category alignments
+PERSONALIZED_FEATURE_LOW = np.array([
+    [0.6, 0.0, 0.6, 0.6, 0.6, 0.6],  # Low risk: high alignment, low conflict
+    [0.4, 0.1, 0.3, 0.3, 0.3, 0.3],  # Medium risk: mixed patterns
+    [0.2, 0.3, 0.2, 0.2, 0.2, 0.2]   # High risk: low alignment, high conflict
+])
+PERSONALIZED_FEATURE_HIGH = np.array([
+    [0.9, 0.2, 0.9, 0.9, 0.9, 0.9],
+    [0.7, 0.4, 0.7, 0.7, 0.7, 0.7],
+    [0.5, 0.7, 0.5, 0.5, 0.5, 0.5]
+])
+
+# Ranges of synthetic category scores per risk code (Low, Medium, High) for training fill-ins
+SYNTHETIC_CATEGORY_SCORE_LOW = np.array([0.0, 0.3, 0.5])
+SYNTHETIC_CATEGORY_SCORE_HIGH = np.array([0.5, 0.7, 1.0])
+
+def choice_per_row(options, probabilities, rng):
+    """Draw one option per row, where each row of probabilities is its own distribution"""
+    cumulative = np.cumsum(probabilities, axis=1)
+    draws = rng.random(len(cumulative))
+    indices = (draws[:, None] >= cumulative[:, :-1]).sum(axis=1)
+    return np.asarray(options)[indices]
+
+def target_disagree_ratios(num_couples, rng):
+    """Draw target disagree ratios for a 33% Low / 34% Medium / 33% High allocation"""
+    num_low = int(num_couples * 0.33)
+    num_medium = int(num_couples * 0.34)
+    
+    # Target ranges adjusted to match thresholds: High >0.35, Medium >0.20, Low ≤0.20
+    low = np.full(num_couples, 0.35)
+    high = np.full(num_couples, 0.60)
+    low[:num_low], high[:num_low] = 0.0, 0.20  # Low risk: 0-20% disagree
+    low[num_low:num_low + num_medium], high[num_low:num_low + num_medium] = 0.20, 0.35  # Medium risk: 20-35% disagree
+    return rng.uniform(low, high)
+
+def add_partner_variation(questionnaire_responses, rng):
+    """Derive separate (N, Q) male/female response matrices from shared couple responses"""
+    shape = questionnaire_responses.shape
+    
+    # 30% chance of partner disagreement (difference of 1)
+    minor = rng.random(shape) < 0.3
+    # 10% chance of significant disagreement (difference of 2)
+    major = ~minor & (rng.random(shape) < 0.1)
+    male_side = rng.random(shape) < 0.5
+    direction = rng.choice(np.array([-1, 1], dtype=np.int8), shape)
+    
+    shift = np.where(minor, direction, np.where(major, 2 * direction, 0))
+    male_responses = np.clip(questionnaire_responses + np.where(male_side, shift, 0), 2, 4).astype(np.int8)
+    female_responses = np.clip(questionnaire_responses + np.where(male_side, 0, shift), 2, 4).astype(np.int8)
+    return male_responses, female_responses
+
+def calculate_synthetic_labels(questionnaire_responses):
+    """Risk level codes and category scores for an (N, Q) synthetic response matrix"""
+    disagree = questionnaire_responses == 2
+    
+    # Use same thresholds as training: High >0.35, Medium >0.20, Low ≤0.20
+    disagree_ratio = disagree.mean(axis=1)
+    risk_level = np.where(disagree_ratio > 0.35, 2, np.where(disagree_ratio > 0.20, 1, 0)).astype(np.int8)
+    
+    # Generate category scores based on actual question-category mapping, one matmul for all couples
+    num_categories, total_questions = len(MEAI_CATEGORIES), questionnaire_responses.shape[1]
+    category_mask = CATEGORY_MASK[:num_categories, :total_questions]
+    if category_mask.shape != (num_categories, total_questions):
+        category_mask = np.zeros((num_categories, total_questions), dtype=np.float32)
+        rows, cols = min(num_categories, CATEGORY_MASK.shape[0]), min(total_questions, CATEGORY_MASK.shape[1])
+        category_mask[:rows, :cols] = CATEGORY_MASK[:rows, :cols]
+    question_counts = category_mask.sum(axis=1, dtype=np.float64)
+    disagree_counts = disagree.astype(np.float32) @ category_mask.T
+    
+    # Convert disagreement ratio to 0-1 score (higher disagreement = higher score); default score if no questions
+    category_scores = np.full(disagree_counts.shape, 0.5)
+    has_questions = question_counts > 0
+    category_scores[:, has_questions] = np.minimum(1.0, disagree_counts[:, has_questions] / question_counts[has_questions] * 2)
+    
+    return risk_level, category_scores
+
+def concat_training_columns(*parts):
+    """Concatenate columnar training data sets (dicts of NumPy arrays with the same keys) row-wise"""
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+def count_training_couples(columns):
+    """Number of couples in a columnar training data set"""
+    return len(columns['risk_level'])
+
+def risk_level_distribution(risk_codes):
+    """{risk level name: count} for the risk levels present in an array of risk codes"""
+    counts = np.bincount(risk_codes, minlength=len(RISK_LEVELS))
+    return {RISK_LEVELS[code]: int(count) for code, count in enumerate(counts) if count}
+
 def generate_synthetic_data_based_on_real_couples(num_couples, real_couples_data):
     """Generate synthetic couples based on patterns from real couples"""
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     
-    if not real_couples_data:
+    if real_couples_data is None or count_training_couples(real_couples_data) == 0:
         print("No real couples data available, using generic synthetic data")
         return generate_synthetic_data(num_couples)
     
-    print(f"Generating {num_couples} synthetic couples based on {len(real_couples_data)} real couples")
-    
-    # Extract patterns from real couples
-    real_ages = [(row['male_age'], row['female_age']) for row in real_couples_data]
-    real_civil_status = [row['civil_status'] for row in real_couples_data]
-    real_education = [row['education_level'] for row in real_couples_data]
-    real_income = [row['income_level'] for row in real_couples_data]
-    real_children = [row['children'] for row in real_couples_data]
-    real_years_together = [row['years_living_together'] for row in real_couples_data]
-    real_responses = [row['questionnaire_responses'] for row in real_couples_data]
-    real_risk_levels = [row['risk_level'] for row in real_couples_data]
-    
-    # Calculate statistics from real data
-    male_ages = [age[0] for age in real_ages]
-    female_ages = [age[1] for age in real_ages]
-    age_gaps = [abs(age[0] - age[1]) for age in real_ages]
-    
-    # Ensure we generate samples for all 3 risk classes
-    # Allocate: 33% Low, 34% Medium, 33% High (more balanced distribution)
-    num_low = int(num_couples * 0.33)
-    num_medium = int(num_couples * 0.34)
-    num_high = num_couples - num_low - num_medium
-    
-    data = []
-    
-    # Generate couples for all risk classes in one loop
-    for i in range(num_couples):
-        # Sample from real couple patterns with some variation
-        base_couple_idx = np.random.randint(0, len(real_couples_data))
-        base_couple = real_couples_data[base_couple_idx]
-        
-        # Generate ages based on real patterns with variation
-        male_age = int(np.random.normal(np.mean(male_ages), np.std(male_ages)))
-        female_age = int(np.random.normal(np.mean(female_ages), np.std(female_ages)))
-        
-        # Ensure realistic age ranges
-        male_age = max(18, min(80, male_age))
-        female_age = max(18, min(80, female_age))
-        
-        # Age gap based on real patterns
-        real_age_gap = abs(male_age - female_age)
-        if real_age_gap > np.percentile(age_gaps, 90):  # Large age gap
-            # Keep the large gap but adjust ages
-            if male_age > female_age:
-                female_age = max(18, male_age - real_age_gap)
-            else:
-                male_age = max(18, female_age - real_age_gap)
-        
-        # Sample other attributes from real couples with variation
-        civil_status = np.random.choice(real_civil_status)
-        
-        # Years living together based on civil status and age
-        if civil_status == 'Living In':
-            years_living_together = np.random.randint(1, max(1, int(np.mean(real_years_together)) + 5))
-        else:
-            years_living_together = 0
-        
-        # Children based on real patterns
-        has_past_children = np.random.choice([True, False], p=[0.3, 0.7]) if np.random.random() < 0.4 else False
-        if has_past_children:
-            children = np.random.choice(real_children) if real_children else np.random.randint(1, 3)
-        else:
-            children = 0
-        
-        # Education and income based on real patterns
-        education_level = np.random.choice(real_education)
-        income_level = np.random.choice(real_income)
-        
-        # Generate questionnaire responses based on real patterns
-        base_responses = base_couple['questionnaire_responses']
-        questionnaire_responses = []
-        
-        # Determine target risk level for this couple
-        # Target ranges adjusted to match thresholds: High >0.35, Medium >0.20, Low ≤0.20
-        if i < num_low:
-            target_risk = 'Low'
-            target_disagree_ratio = np.random.uniform(0.0, 0.20)  # Low risk: 0-20% disagree
-        elif i < num_low + num_medium:
-            target_risk = 'Medium'
-            target_disagree_ratio = np.random.uniform(0.20, 0.35)  # Medium risk: 20-35% disagree
-        else:
-            target_risk = 'High'
-            target_disagree_ratio = np.random.uniform(0.35, 0.60)  # High risk: 35-60% disagree
-        
-        # Generate responses to match target disagree ratio
-        total_questions = len(base_responses)
-        target_disagree_count = int(total_questions * target_disagree_ratio)
-        target_agree_count = int(total_questions * (1 - target_disagree_ratio) * 0.6)  # 60% of remaining are agree
-        target_neutral_count = total_questions - target_disagree_count - target_agree_count
-        
-        # Create response array
-        response_array = [2] * target_disagree_count + [4] * target_agree_count + [3] * target_neutral_count
-        np.random.shuffle(response_array)
-        
-        # Apply some variation based on real patterns
-        for j, base_response in enumerate(base_responses):
-            if j < len(response_array):
-                # Blend target response with base pattern (70% target, 30% base)
-                if np.random.random() < 0.3:
-                    variation = np.random.choice([-1, 0, 1], p=[0.1, 0.8, 0.1])
-                    new_response = max(2, min(4, base_response + variation))
-                else:
-                    new_response = response_array[j]
-                questionnaire_responses.append(new_response)
-            else:
-                questionnaire_responses.append(response_array[j % len(response_array)])
-        
-        # Calculate actual risk level based on response patterns
-        disagree_count = sum(1 for r in questionnaire_responses if r == 2)
-        disagree_ratio = disagree_count / len(questionnaire_responses)
-        
-        # Use same thresholds as training: High >0.35, Medium >0.20, Low ≤0.20
-        if disagree_ratio > 0.35:
-            risk_level = 'High'
-        elif disagree_ratio > 0.20:
-            risk_level = 'Medium'
-        else:
-            risk_level = 'Low'
-        
-        # Generate category scores based on actual question-category mapping
-        category_scores = []
-        
-        for category_id in range(1, len(MEAI_CATEGORIES) + 1):
-            # Get questions for this category
-            category_question_ids = [qid for qid, cid in MEAI_QUESTION_MAPPING.items() if cid == category_id]
-            
-            if not category_question_ids:
-                category_scores.append(0.5)  # Default score if no questions
-                continue
-            
-            # Get responses for questions in this category
-            category_responses = []
-            for qid in category_question_ids:
-                # Find response index for this question
-                if qid <= len(questionnaire_responses):
-                    category_responses.append(questionnaire_responses[qid - 1])  # question_id is 1-indexed
-            
-            if not category_responses:
-                category_scores.append(0.5)  # Default score if no responses
-                continue
-            
-            # Calculate disagreement ratio for this category
-            cat_disagree_ratio = sum(1 for r in category_responses if r == 2) / len(category_responses)
-            
-            # Convert to 0-1 score (higher disagreement = higher score)
-            category_score = min(1.0, cat_disagree_ratio * 2)  # Scale up disagreement
-            category_scores.append(category_score)
-        
-        # CRITICAL: Generate separate male_responses and female_responses
-        # For synthetic data, we'll generate similar but slightly different responses
-        # to simulate real couple dynamics
-        male_responses = questionnaire_responses.copy()
-        female_responses = questionnaire_responses.copy()
-        
-        # Add some variation between partners (simulate real couple differences)
-        for j in range(len(questionnaire_responses)):
-            # 30% chance of partner disagreement (difference of 1)
-            if np.random.random() < 0.3:
-                if np.random.random() < 0.5:
-                    # Male slightly more positive/negative
-                    male_responses[j] = max(2, min(4, male_responses[j] + np.random.choice([-1, 1])))
-                else:
-                    # Female slightly more positive/negative
-                    female_responses[j] = max(2, min(4, female_responses[j] + np.random.choice([-1, 1])))
-            # 10% chance of significant disagreement (difference of 2)
-            elif np.random.random() < 0.1:
-                if np.random.random() < 0.5:
-                    male_responses[j] = max(2, min(4, male_responses[j] + np.random.choice([-2, 2])))
-                else:
-                    female_responses[j] = max(2, min(4, female_responses[j] + np.random.choice([-2, 2])))
-        
-        data.append({
-            'male_age': male_age,
-            'female_age': female_age,
-            'civil_status': civil_status,
-            'years_living_together': years_living_together,
-            'past_children': has_past_children,
-            'children': children,
-            'education_level': education_level,
-            'income_level': income_level,
-            'questionnaire_responses': questionnaire_responses,  # Keep for backward compatibility
-            'male_responses': male_responses,  # CRITICAL: Separate male responses (59 features)
-            'female_responses': female_responses,  # CRITICAL: Separate female responses (59 features)
-            'risk_level': risk_level,
-            'category_scores': category_scores
-        })
+    num_real_couples = count_training_couples(real_couples_data)
+    print(f"Generating {num_couples} synthetic couples based on {num_real_couples} real couples")
+    
+    # Extract patterns from real couples (already columnar)
+    real_male_ages = real_couples_data['male_age']
+    real_female_ages = real_couples_data['female_age']
+    real_civil_status = real_couples_data['civil_status']
+    real_education = real_couples_data['education_level']
+    real_income = real_couples_data['income_level']
+    real_children = real_couples_data['children']
+    real_years_together = real_couples_data['years_living_together']
+    real_responses = real_couples_data['questionnaire_responses']
+    
+    # Sample from real couple patterns with some variation
+    base_couple_idx = rng.integers(0, num_real_couples, num_couples)
+    
+    # Generate ages based on real patterns with variation, within realistic ranges
+    male_age = np.clip(rng.normal(real_male_ages.mean(), real_male_ages.std(), num_couples).astype(int), 18, 80)
+    female_age = np.clip(rng.normal(real_female_ages.mean(), real_female_ages.std(), num_couples).astype(int), 18, 80)
+    
+    # Sample other attributes from real couples with variation
+    civil_status = rng.choice(real_civil_status, num_couples)
+    
+    # Years living together based on civil status
+    years_living_together = np.where(
+        civil_status == 'Living In', rng.integers(1, max(1, int(np.mean(real_years_together)) + 5), num_couples), 0
+    )
+    
+    # Children based on real patterns
+    has_past_children = (rng.random(num_couples) < 0.4) & (rng.random(num_couples) < 0.3)
+    past_children_counts = rng.choice(real_children, num_couples) if len(real_children) else rng.integers(1, 3, num_couples)
+    children = np.where(has_past_children, past_children_counts, 0)
+    
+    # Education and income based on real patterns
+    education_level = rng.choice(real_education, num_couples)
+    income_level = rng.choice(real_income, num_couples)
+    
+    # Generate questionnaire responses to match each couple's target disagree ratio
+    target_disagree_ratio = target_disagree_ratios(num_couples, rng)
+    total_questions = real_responses.shape[1]
     
-    return data
+    target_disagree_count = (total_questions * target_disagree_ratio).astype(int)
+    target_agree_count = (total_questions * (1 - target_disagree_ratio) * 0.6).astype(int)  # 60% of remaining are agree
+    
+    # Create response arrays (disagree, then agree, then neutral) and shuffle each row independently
+    position = np.arange(total_questions)
+    response_array = np.where(
+        position < target_disagree_count[:, None], 2,
+        np.where(position < (target_disagree_count + target_agree_count)[:, None], 4, 3)
+    ).astype(np.int8)
+    response_array = rng.permuted(response_array, axis=1)
+    
+    # Apply some variation based on real patterns: blend target response with base pattern (70% target, 30% base)
+    use_base = rng.random((num_couples, total_questions)) < 0.3
+    variation = rng.choice(np.array([-1, 0, 1], dtype=np.int8), (num_couples, total_questions), p=[0.1, 0.8, 0.1])
+    base_responses = real_responses[base_couple_idx]
+    questionnaire_responses = np.where(use_base, np.clip(base_responses + variation, 2, 4), response_array).astype(np.int8)
+    
+    # Calculate actual risk level and category scores based on response patterns
+    risk_level, category_scores = calculate_synthetic_labels(questionnaire_responses)
+    
+    # CRITICAL: Generate separate male_responses and female_responses
+    # For synthetic data, we'll generate similar but slightly different responses
+    # to simulate real couple dynamics
+    male_responses, female_responses = add_partner_variation(questionnaire_responses, rng)
+    
+    return {
+        'male_age': male_age.astype(np.int16),
+        'female_age': female_age.astype(np.int16),
+        'civil_status': civil_status,
+        'years_living_together': years_living_together.astype(np.int16),
+        'past_children': has_past_children,
+        'children': children.astype(np.int8),
+        'education_level': education_level.astype(np.int8),
+        'income_level': income_level.astype(np.int8),
+        'questionnaire_responses': questionnaire_responses,
+        'male_responses': male_responses,
+        'female_responses': female_responses,
+        'risk_level': risk_level,
+        'category_scores': category_scores
+    }
 
 def generate_synthetic_data(num_couples=500):
     """Generate realistic synthetic couple data for training (fallback method)"""
-    np.random.seed(42)
-    
-    data = []
-    
-    # Ensure we generate samples for all 3 risk classes
-    # Allocate: 33% Low, 34% Medium, 33% High (more balanced distribution)
-    num_low = int(num_couples * 0.33)
-    num_medium = int(num_couples * 0.34)
-    num_high = num_couples - num_low - num_medium
+    rng = np.random.default_rng(42)
     
     # Define realistic couple profiles with different risk patterns
+    # risk_bias: 0 = low, 1 = medium, 2 = high
     couple_profiles = [
         # Young couples (18-25) - often higher risk due to immaturity
-        {'age_range': (18, 25), 'risk_bias': 'high', 'weight': 0.15},
+        {'age_range': (18, 25), 'risk_bias': 2, 'weight': 0.15},
         # Young adults (25-30) - moderate risk, learning phase
-        {'age_range': (25, 30), 'risk_bias': 'medium', 'weight': 0.25},
+        {'age_range': (25, 30), 'risk_bias': 1, 'weight': 0.25},
         # Mature couples (30-40) - lower risk, more stable
-        {'age_range': (30, 40), 'risk_bias': 'low', 'weight': 0.30},
+        {'age_range': (30, 40), 'risk_bias': 0, 'weight': 0.30},
         # Established couples (40-50) - very low risk, experienced
-        {'age_range': (40, 50), 'risk_bias': 'low', 'weight': 0.20},
+        {'age_range': (40, 50), 'risk_bias': 0, 'weight': 0.20},
         # Older couples (50+) - mixed, some very stable, some with issues
-        {'age_range': (50, 70), 'risk_bias': 'medium', 'weight': 0.10}
+        {'age_range': (50, 70), 'risk_bias': 1, 'weight': 0.10}
     ]
     
-    for i in range(num_couples):
-        # Select couple profile based on weights
-        profile = np.random.choice(couple_profiles, p=[p['weight'] for p in couple_profiles])
-        min_age, max_age = profile['age_range']
-        risk_bias = profile['risk_bias']
-        
-        # Generate ages with realistic age gaps
-        male_age = np.random.randint(min_age, max_age + 1)
-        
-        # Age gap patterns: most couples have 0-5 year gap, some have larger gaps
-        age_gap_options = [
-            (0, 2),    # Same age: 40%
-            (1, 3),    # Small gap: 30%
-            (2, 5),    # Medium gap: 20%
-            (5, 15),   # Large gap: 8%
-            (15, 25)   # Very large gap: 2%
-        ]
-        age_gap_weights = [0.40, 0.30, 0.20, 0.08, 0.02]
-        
-        age_gap_range = age_gap_options[np.random.choice(len(age_gap_options), p=age_gap_weights)]
-        age_gap = np.random.randint(age_gap_range[0], age_gap_range[1] + 1)
-        
-        # Female age based on male age and gap
-        if np.random.random() < 0.5:  # 50% chance female is younger
-            female_age = max(18, male_age - age_gap)
-        else:  # 50% chance female is older
-            female_age = min(80, male_age + age_gap)
-        
-        # Civil status based on age and risk profile
-        if risk_bias == 'high':
-            civil_status_options = ['Single', 'Single', 'Living In', 'Separated', 'Divorced']
-        elif risk_bias == 'low':
-            civil_status_options = ['Single', 'Living In', 'Living In', 'Widowed']
-        else:  # medium
-            civil_status_options = ['Single', 'Living In', 'Widowed', 'Separated']
-        
-        civil_status = np.random.choice(civil_status_options)
-        
-        # Years living together based on civil status and age
-        if civil_status == 'Living In':
-            if male_age < 25:
-                years_living_together = np.random.randint(1, 5)  # Young couples, shorter time
-            elif male_age < 40:
-                years_living_together = np.random.randint(1, 15)  # Mature couples, longer time
-            else:
-                years_living_together = np.random.randint(5, 25)  # Older couples, very long time
-        else:
-            years_living_together = 0
-        
-        # Past children based on age and civil status
-        if male_age > 25 and civil_status in ['Living In', 'Widowed', 'Divorced']:
-            has_past_children = np.random.choice([True, False], p=[0.4, 0.6])
-        else:
-            has_past_children = np.random.choice([True, False], p=[0.1, 0.9])
-        
-        if has_past_children:
-            if male_age < 30:
-                children = np.random.randint(1, 3)  # Young parents, fewer children
-            else:
-                children = np.random.randint(1, 5)  # Older parents, more children
-        else:
-            children = 0
-        
-        # Education levels based on age (older = more likely higher education)
-        if male_age < 25:
-            education_level = np.random.choice([0, 1, 2, 3, 4], p=[0.1, 0.2, 0.4, 0.2, 0.1])
-        elif male_age < 40:
-            education_level = np.random.choice([0, 1, 2, 3, 4], p=[0.05, 0.1, 0.3, 0.4, 0.15])
-        else:
-            education_level = np.random.choice([0, 1, 2, 3, 4], p=[0.05, 0.05, 0.2, 0.5, 0.2])
-        
-        # Income levels based on education and age
-        if education_level >= 3:  # Higher education
-            income_level = np.random.choice([2, 3, 4], p=[0.2, 0.5, 0.3])
-        elif education_level >= 2:  # Medium education
-            income_level = np.random.choice([1, 2, 3, 4], p=[0.1, 0.4, 0.4, 0.1])
-        else:  # Lower education
-            income_level = np.random.choice([0, 1, 2, 3], p=[0.2, 0.4, 0.3, 0.1])
-        
-        # Generate questionnaire responses (3-option scale: agree/neutral/disagree)
-        # Use dynamic question count from database
-        total_questions = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 31  # Fallback to 31
-        questionnaire_responses = np.random.randint(2, 5, total_questions)  # 2=disagree, 3=neutral, 4=agree
-        
-        # Determine target risk level for this couple based on allocation
-        # Target ranges adjusted to match thresholds: High >0.35, Medium >0.20, Low ≤0.20
-        if i < num_low:
-            target_risk = 'Low'
-            target_disagree_ratio = np.random.uniform(0.0, 0.20)  # Low risk: 0-20% disagree
-        elif i < num_low + num_medium:
-            target_risk = 'Medium'
-            target_disagree_ratio = np.random.uniform(0.20, 0.35)  # Medium risk: 20-35% disagree
-        else:
-            target_risk = 'High'
-            target_disagree_ratio = np.random.uniform(0.35, 0.60)  # High risk: 35-60% disagree
-        
-        # Generate responses based on target risk level and couple characteristics
-        base_disagree_prob = target_disagree_ratio
-        base_agree_prob = (1 - target_disagree_ratio) * 0.6  # 60% of remaining are agree
-        
-        # Adjust based on age gap (larger gaps = more disagreements)
-        age_gap = abs(male_age - female_age)
-        if age_gap > 10:
-            base_disagree_prob = min(0.8, base_disagree_prob + 0.1)
-            base_agree_prob = max(0.1, base_agree_prob - 0.05)
-        elif age_gap > 5:
-            base_disagree_prob = min(0.8, base_disagree_prob + 0.05)
-            base_agree_prob = max(0.1, base_agree_prob - 0.02)
-        
-        # Adjust based on education mismatch
-        education_diff = abs(education_level - income_level)
-        if education_diff > 2:
-            base_disagree_prob = min(0.8, base_disagree_prob + 0.05)
-            base_agree_prob = max(0.1, base_agree_prob - 0.02)
-        
-        # Adjust based on civil status
-        if civil_status in ['Separated', 'Divorced']:
-            base_disagree_prob = min(0.8, base_disagree_prob + 0.1)
-            base_agree_prob = max(0.1, base_agree_prob - 0.05)
-        elif civil_status == 'Living In' and years_living_together > 10:
-            base_disagree_prob = max(0.05, base_disagree_prob - 0.05)
-            base_agree_prob = min(0.8, base_agree_prob + 0.05)
-        
-        # Ensure probabilities are valid
-        base_disagree_prob = max(0.05, min(0.8, base_disagree_prob))
-        base_agree_prob = max(0.1, min(0.8, base_agree_prob))
-        base_neutral_prob = 1.0 - base_disagree_prob - base_agree_prob
-        
-        # Generate responses
-        questionnaire_responses = np.random.choice(
-            [2, 3, 4],  # disagree, neutral, agree
-            total_questions,
-            p=[base_disagree_prob, base_neutral_prob, base_agree_prob]
-        )
-        
-        # Calculate risk level based on actual response patterns
-        # Use same thresholds as training: High >0.35, Medium >0.20, Low ≤0.20
-        disagree_count = sum(1 for r in questionnaire_responses if r == 2)
-        disagree_ratio = disagree_count / len(questionnaire_responses)
-        
-        if disagree_ratio > 0.35:
-            risk_level = 'High'
-        elif disagree_ratio > 0.20:
-            risk_level = 'Medium'
-        else:
-            risk_level = 'Low'
-        
-        # Generate category scores based on actual question-category mapping
-        category_scores = []
-        
-        for category_id in range(1, len(MEAI_CATEGORIES) + 1):
-            # Get questions for this category
-            category_question_ids = [qid for qid, cid in MEAI_QUESTION_MAPPING.items() if cid == category_id]
-            
-            if not category_question_ids:
-                category_scores.append(0.5)  # Default score if no questions
-                continue
-            
-            # Get responses for questions in this category
-            category_responses = []
-            for qid in category_question_ids:
-                # Find response index for this question
-                if qid <= len(questionnaire_responses):
-                    category_responses.append(questionnaire_responses[qid - 1])  # question_id is 1-indexed
-            
-            if not category_responses:
-                category_scores.append(0.5)  # Default score if no responses
-                continue
-            
-            # Calculate disagreement ratio for this category
-            cat_disagree_ratio = sum(1 for r in category_responses if r == 2) / len(category_responses)
-            
-            # Convert to 0-1 score (higher disagreement = higher score)
-            category_score = min(1.0, cat_disagree_ratio * 2)  # Scale up disagreement
-            category_scores.append(category_score)
-        
-        # CRITICAL: Generate separate male_responses and female_responses
-        # For synthetic data, we'll generate similar but slightly different responses
-        # to simulate real couple dynamics
-        male_responses = questionnaire_responses.copy()
-        female_responses = questionnaire_responses.copy()
-        
-        # Add some variation between partners (simulate real couple differences)
-        for j in range(len(questionnaire_responses)):
-            # 30% chance of partner disagreement (difference of 1)
-            if np.random.random() < 0.3:
-                if np.random.random() < 0.5:
-                    # Male slightly more positive/negative
-                    male_responses[j] = max(2, min(4, male_responses[j] + np.random.choice([-1, 1])))
-                else:
-                    # Female slightly more positive/negative
-                    female_responses[j] = max(2, min(4, female_responses[j] + np.random.choice([-1, 1])))
-            # 10% chance of significant disagreement (difference of 2)
-            elif np.random.random() < 0.1:
-                if np.random.random() < 0.5:
-                    male_responses[j] = max(2, min(4, male_responses[j] + np.random.choice([-2, 2])))
-                else:
-                    female_responses[j] = max(2, min(4, female_responses[j] + np.random.choice([-2, 2])))
-        
-        data.append({
-            'male_age': male_age,
-            'female_age': female_age,
-            'civil_status': civil_status,
-            'years_living_together': years_living_together,
-            'past_children': has_past_children,
-            'children': children,
-            'education_level': education_level,
-            'income_level': income_level,
-            'questionnaire_responses': questionnaire_responses.tolist(),  # Keep for backward compatibility
-            'male_responses': male_responses.tolist() if isinstance(male_responses, np.ndarray) else male_responses,  # CRITICAL: Separate male responses (59 features)
-            'female_responses': female_responses.tolist() if isinstance(female_responses, np.ndarray) else female_responses,  # CRITICAL: Separate female responses (59 features)
-            'risk_level': risk_level,
-            'category_scores': category_scores
-        })
+    # Select couple profile based on weights
+    profile_idx = rng.choice(len(couple_profiles), num_couples, p=[p['weight'] for p in couple_profiles])
+    min_age = np.array([p['age_range'][0] for p in couple_profiles])[profile_idx]
+    max_age = np.array([p['age_range'][1] for p in couple_profiles])[profile_idx]
+    risk_bias = np.array([p['risk_bias'] for p in couple_profiles])[profile_idx]
+    
+    # Generate ages with realistic age gaps
+    male_age = rng.integers(min_age, max_age + 1)
+    
+    # Age gap patterns: most couples have 0-5 year gap, some have larger gaps
+    age_gap_options = np.array([
+        (0, 2),    # Same age: 40%
+        (1, 3),    # Small gap: 30%
+        (2, 5),    # Medium gap: 20%
+        (5, 15),   # Large gap: 8%
+        (15, 25)   # Very large gap: 2%
+    ])
+    age_gap_weights = [0.40, 0.30, 0.20, 0.08, 0.02]
+    
+    age_gap_range = age_gap_options[rng.choice(len(age_gap_options), num_couples, p=age_gap_weights)]
+    age_gap = rng.integers(age_gap_range[:, 0], age_gap_range[:, 1] + 1)
+    
+    # Female age based on male age and gap: 50% chance female is younger, 50% older
+    female_younger = rng.random(num_couples) < 0.5
+    female_age = np.where(female_younger, np.maximum(18, male_age - age_gap), np.minimum(80, male_age + age_gap))
+    
+    # Civil status based on risk profile (columns follow CIVIL_STATUS_OPTIONS)
+    civil_status_probs = np.array([
+        [0.25, 0.50, 0.00, 0.00, 0.25],  # low:    Single, Living In x2, Widowed
+        [0.25, 0.25, 0.25, 0.00, 0.25],  # medium: Single, Living In, Widowed, Separated
+        [0.40, 0.20, 0.20, 0.20, 0.00]   # high:   Single x2, Living In, Separated, Divorced
+    ])
+    civil_status = choice_per_row(CIVIL_STATUS_OPTIONS, civil_status_probs[risk_bias], rng)
+    
+    # Years living together based on civil status and age
+    # Young couples, shorter time; mature couples, longer time; older couples, very long time
+    years_low = np.where(male_age < 25, 1, np.where(male_age < 40, 1, 5))
+    years_high = np.where(male_age < 25, 5, np.where(male_age < 40, 15, 25))
+    years_living_together = np.where(civil_status == 'Living In', rng.integers(years_low, years_high), 0)
+    
+    # Past children based on age and civil status
+    likely_parents = (male_age > 25) & np.isin(civil_status, ['Living In', 'Widowed', 'Divorced'])
+    has_past_children = rng.random(num_couples) < np.where(likely_parents, 0.4, 0.1)
+    
+    # Young parents, fewer children; older parents, more children
+    children = np.where(has_past_children, rng.integers(1, np.where(male_age < 30, 3, 5)), 0)
+    
+    # Education levels based on age (older = more likely higher education)
+    education_probs = np.array([
+        [0.10, 0.20, 0.40, 0.20, 0.10],  # under 25
+        [0.05, 0.10, 0.30, 0.40, 0.15],  # 25-39
+        [0.05, 0.05, 0.20, 0.50, 0.20]   # 40+
+    ])
+    age_band = np.where(male_age < 25, 0, np.where(male_age < 40, 1, 2))
+    education_level = choice_per_row(np.arange(5), education_probs[age_band], rng)
+    
+    # Income levels based on education
+    income_probs = np.array([
+        [0.20, 0.40, 0.30, 0.10, 0.00],  # Lower education
+        [0.00, 0.10, 0.40, 0.40, 0.10],  # Medium education
+        [0.00, 0.00, 0.20, 0.50, 0.30]   # Higher education
+    ])
+    education_band = np.where(education_level >= 3, 2, np.where(education_level >= 2, 1, 0))
+    income_level = choice_per_row(np.arange(5), income_probs[education_band], rng)
+    
+    # Determine target risk level for each couple based on allocation
+    target_disagree_ratio = target_disagree_ratios(num_couples, rng)
+    
+    # Generate questionnaire responses (3-option scale: agree/neutral/disagree)
+    # Use dynamic question count from database
+    total_questions = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 31  # Fallback to 31
+    
+    # Generate responses based on target risk level and couple characteristics
+    disagree_prob = target_disagree_ratio
+    agree_prob = (1 - target_disagree_ratio) * 0.6  # 60% of remaining are agree
+    
+    # Adjust based on age gap (larger gaps = more disagreements)
+    couple_age_gap = np.abs(male_age - female_age)
+    large_gap = couple_age_gap > 10
+    medium_gap = ~large_gap & (couple_age_gap > 5)
+    disagree_prob = np.where(large_gap, np.minimum(0.8, disagree_prob + 0.1), disagree_prob)
+    agree_prob = np.where(large_gap, np.maximum(0.1, agree_prob - 0.05), agree_prob)
+    disagree_prob = np.where(medium_gap, np.minimum(0.8, disagree_prob + 0.05), disagree_prob)
+    agree_prob = np.where(medium_gap, np.maximum(0.1, agree_prob - 0.02), agree_prob)
+    
+    # Adjust based on education mismatch
+    education_mismatch = np.abs(education_level - income_level) > 2
+    disagree_prob = np.where(education_mismatch, np.minimum(0.8, disagree_prob + 0.05), disagree_prob)
+    agree_prob = np.where(education_mismatch, np.maximum(0.1, agree_prob - 0.02), agree_prob)
+    
+    # Adjust based on civil status
+    separated = np.isin(civil_status, ['Separated', 'Divorced'])
+    long_living_in = ~separated & (civil_status == 'Living In') & (years_living_together > 10)
+    disagree_prob = np.where(separated, np.minimum(0.8, disagree_prob + 0.1), disagree_prob)
+    agree_prob = np.where(separated, np.maximum(0.1, agree_prob - 0.05), agree_prob)
+    disagree_prob = np.where(long_living_in, np.maximum(0.05, disagree_prob - 0.05), disagree_prob)
+    agree_prob = np.where(long_living_in, np.minimum(0.8, agree_prob + 0.05), agree_prob)
+    
+    # Ensure probabilities are valid
+    disagree_prob = np.clip(disagree_prob, 0.05, 0.8)
+    agree_prob = np.clip(agree_prob, 0.1, 0.8)
+    neutral_prob = 1.0 - disagree_prob - agree_prob
+    
+    # Draw the whole (N, Q) response matrix at once by inverse CDF over disagree, neutral, agree
+    cumulative = np.stack([disagree_prob, disagree_prob + neutral_prob], axis=1)
+    draws = rng.random((num_couples, total_questions))
+    questionnaire_responses = (2 + (draws[:, :, None] >= cumulative[:, None, :]).sum(axis=2)).astype(np.int8)
+    
+    # Calculate risk level and category scores based on actual response patterns
+    risk_level, category_scores = calculate_synthetic_labels(questionnaire_responses)
+    
+    # CRITICAL: Generate separate male_responses and female_responses
+    # For synthetic data, we'll generate similar but slightly different responses
+    # to simulate real couple dynamics
+    male_responses, female_responses = add_partner_variation(questionnaire_responses, rng)
     
-    return data
+    return {
+        'male_age': male_age.astype(np.int16),
+        'female_age': female_age.astype(np.int16),
+        'civil_status': civil_status,
+        'years_living_together': years_living_together.astype(np.int16),
+        'past_children': has_past_children,
+        'children': children.astype(np.int8),
+        'education_level': education_level.astype(np.int8),
+        'income_level': income_level.astype(np.int8),
+        'questionnaire_responses': questionnaire_responses,
+        'male_responses': male_responses,
+        'female_responses': female_responses,
+        'risk_level': risk_level,
+        'category_scores': category_scores
+    }
+
+# Rows fetched per round trip when streaming couple responses for training
+TRAINING_FETCH_BATCH_SIZE = 1000
+
+def iter_response_codes(cursor, batch_size=TRAINING_FETCH_BATCH_SIZE):
+    """Yield (row, numeric response) pairs from an executed couple_responses query, fetchmany batch by batch"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        
+        # Convert the batch's response column to numeric at once (2=disagree, 3=neutral, 4=agree)
+        # Anything else (including NULL) counts as disagree
+        response_column = np.array([row[5] for row in rows], dtype=object)
+        response_codes = np.select(
+            [response_column == 'agree', response_column == 'neutral'], [4, 3], default=2
+        ).astype(np.int8)
+        yield from zip(rows, response_codes.tolist())
 
 def load_real_couples_for_training():
     """Load real couples from database for ML training"""
+    from pymysql.cursors import SSCursor
     try:
-        import pymysql
-        
-        # Database connection - Auto-detect local vs remote
-        db_config = get_db_config()
-        conn = pymysql.connect(**db_config)
+        # Database connection - Auto-detect local vs remote (pooled)
+        conn = get_db_connection()
         
         cursor = conn.cursor()
         
@@ -1056,12 +1267,32 @@ def load_real_couples_for_training():
         
         if not couples:
             print("No couples found in database")
-            return []
+            return None
         
         print(f"Found {len(couples)} real couples for training")
+        couples_by_id = {couple[0]: couple for couple in couples}
+        
+        # Get MEAI responses for all couples in one query (instead of one query per couple)
+        # Rows are ordered by couple, then category, question, sub-question, then respondent
+        response_query = """
+        SELECT cr.access_id, cr.category_id, cr.question_id, cr.sub_question_id, cr.respondent, cr.response
+        FROM couple_responses cr
+        JOIN (
+            SELECT access_id FROM couple_profile
+            GROUP BY access_id
+            HAVING COUNT(DISTINCT sex) = 2
+        ) c ON c.access_id = cr.access_id
+        ORDER BY cr.access_id, cr.category_id, cr.question_id, COALESCE(cr.sub_question_id, 0), cr.respondent
+        """
+        # Stream the responses with a server-side (unbuffered) cursor instead of holding the whole result set
+        response_cursor = conn.cursor(SSCursor)
+        response_cursor.execute(response_query)
         
-        # Get MEAI responses for each couple
-        training_data = []
+        # Get MEAI responses for each couple, collected column-wise (one list per field)
+        male_ages, female_ages, civil_statuses, years_together_values = [], [], [], []
+        past_children_flags, children_counts, education_levels, income_levels = [], [], [], []
+        questionnaire_rows, male_response_rows, female_response_rows = [], [], []
+        risk_codes, category_score_rows = [], []
         
         # Education and income mapping (same as PHP)
         education_mapping = {
@@ -1076,119 +1307,69 @@ def load_real_couples_for_training():
             '20000-24999': 2, '25000 above': 3
         }
         
-        for couple in couples:
-            access_id, male_name, female_name, male_age, female_age, civil_status, years_living_together, past_children, children, education, monthly_income = couple
+        # Get total expected responses (includes both main questions AND sub-questions)
+        # MEAI_QUESTION_MAPPING maps each answerable question (standalone or sub-question) to a sequential ID
+        total_expected_responses = len(MEAI_QUESTION_MAPPING)
+        
+        # Response position of each (category_id, question_id, sub_question_id) key, in the order defined by
+        # the MEAI_QUESTIONS structure (sub_question_id in database is 1-indexed, None for standalone questions)
+        response_positions = {}
+        for cat_id in sorted(MEAI_QUESTIONS.keys()):
+            cat_questions = MEAI_QUESTIONS[cat_id]
+            for q_id in sorted(cat_questions.keys()):
+                sub_questions = cat_questions[q_id]['sub_questions']
+                sub_q_ids = range(1, len(sub_questions) + 1) if sub_questions else [None]
+                for sub_q_id in sub_q_ids:
+                    if len(response_positions) < total_expected_responses:
+                        response_positions[(cat_id, q_id, sub_q_id)] = len(response_positions)
+        
+        # Couples arrive in access_id order, each with its consecutive (row, numeric response) pairs
+        for access_id, couple_responses in groupby(iter_response_codes(response_cursor), key=lambda item: item[0][0]):
+            couple = couples_by_id.get(access_id)
+            if couple is None:
+                continue
+            _, male_name, female_name, male_age, female_age, civil_status, years_living_together, past_children, children, education, monthly_income = couple
             
-            # Get MEAI responses for this couple from couple_responses table
-            # Get responses ordered by category, question, sub-question, then respondent
-            response_query = """
-            SELECT cr.category_id, cr.question_id, cr.sub_question_id, cr.respondent, cr.response
-            FROM couple_responses cr
-            WHERE cr.access_id = %s
-            ORDER BY cr.category_id, cr.question_id, COALESCE(cr.sub_question_id, 0), cr.respondent
-            """
-            cursor.execute(response_query, (access_id,))
-            responses = cursor.fetchall()
+            # MEAI responses for this couple from couple_responses table
+            responses = list(couple_responses)
             
             if len(responses) < 20:  # Need minimum responses
                 continue
                 
-            # Build response map: (category_id, question_id, sub_question_id) -> {male: val, female: val}
-            response_map = {}
-            for category_id, question_id, sub_question_id, respondent, response in responses:
-                key = (category_id, question_id, sub_question_id)
-                if key not in response_map:
-                    response_map[key] = {'male': None, 'female': None}
-                
-                # Convert response to numeric (2=disagree, 3=neutral, 4=agree)
-                if response == 'agree':
-                    resp_value = 4
-                elif response == 'neutral':
-                    resp_value = 3
-                else:  # disagree
-                    resp_value = 2
-                
-                if respondent.lower() == 'male':
-                    response_map[key]['male'] = resp_value
-                else:
-                    response_map[key]['female'] = resp_value
-            
             # CRITICAL: Build separate male_responses and female_responses arrays
             # This matches the structure used in analysis (118 features: 59 male + 59 female)
-            male_responses_array = []
-            female_responses_array = []
-            questionnaire_responses = []  # Still build combined for backward compatibility
-            
-            # Build responses in the order defined by MEAI_QUESTIONS structure
-            # Iterate through categories and questions in the same order
-            for cat_id in sorted(MEAI_QUESTIONS.keys()):
-                cat_questions = MEAI_QUESTIONS[cat_id]
-                for q_id in sorted(cat_questions.keys()):
-                    q_data = cat_questions[q_id]
-                    
-                    if q_data['sub_questions']:
-                        # Question has sub-questions - map each sub-question
-                        for sub_idx, sub_q_text in enumerate(q_data['sub_questions']):
-                            # sub_question_id in database is 1-indexed, sub_idx is 0-indexed
-                            sub_q_id = sub_idx + 1
-                            key = (cat_id, q_id, sub_q_id)
-                            
-                            # Get separate male and female responses from response_map
-                            male_resp = response_map.get(key, {}).get('male', 3)  # Default to neutral
-                            female_resp = response_map.get(key, {}).get('female', 3)  # Default to neutral
-                            
-                            # Add to separate arrays
-                            male_responses_array.append(male_resp if male_resp is not None else 3)
-                            female_responses_array.append(female_resp if female_resp is not None else 3)
-                            
-                            # Also build combined questionnaire_responses (for backward compatibility)
-                            if male_resp is not None and female_resp is not None:
-                                # Consider partner disagreements as indicators of conflict
-                                if abs(male_resp - female_resp) >= 2:  # Significant disagreement
-                                    avg_resp = min(male_resp, female_resp)
-                                else:
-                                    avg_resp = round((male_resp + female_resp) / 2)
-                                questionnaire_responses.append(avg_resp)
-                            elif male_resp is not None:
-                                questionnaire_responses.append(male_resp)
-                            elif female_resp is not None:
-                                questionnaire_responses.append(female_resp)
-                            else:
-                                questionnaire_responses.append(3)  # Default to neutral
-                    else:
-                        # Standalone question - no sub-question
-                        key = (cat_id, q_id, None)
-                        
-                        # Get separate male and female responses from response_map
-                        male_resp = response_map.get(key, {}).get('male', 3)
-                        female_resp = response_map.get(key, {}).get('female', 3)
-                        
-                        # Add to separate arrays
-                        male_responses_array.append(male_resp if male_resp is not None else 3)
-                        female_responses_array.append(female_resp if female_resp is not None else 3)
-                        
-                        # Also build combined questionnaire_responses
-                        if male_resp is not None and female_resp is not None:
-                            if abs(male_resp - female_resp) >= 2:
-                                avg_resp = min(male_resp, female_resp)
-                            else:
-                                avg_resp = round((male_resp + female_resp) / 2)
-                            questionnaire_responses.append(avg_resp)
-                        elif male_resp is not None:
-                            questionnaire_responses.append(male_resp)
-                        elif female_resp is not None:
-                            questionnaire_responses.append(female_resp)
-                        else:
-                            questionnaire_responses.append(3)  # Default to neutral
+            # Unanswered questions default to neutral (3)
+            male_responses_array = np.full(total_expected_responses, 3, dtype=np.int8)
+            female_responses_array = np.full(total_expected_responses, 3, dtype=np.int8)
+            male_answered = np.zeros(total_expected_responses, dtype=bool)
+            female_answered = np.zeros(total_expected_responses, dtype=bool)
             
-            # Get total expected responses (includes both main questions AND sub-questions)
-            # MEAI_QUESTION_MAPPING maps each answerable question (standalone or sub-question) to a sequential ID
-            total_expected_responses = len(MEAI_QUESTION_MAPPING)
+            for (_, category_id, question_id, sub_question_id, respondent, _), resp_value in responses:
+                position = response_positions.get((category_id, question_id, sub_question_id))
+                if position is None:
+                    continue
+                
+                if respondent.lower() == 'male':
+                    male_responses_array[position] = resp_value
+                    male_answered[position] = True
+                else:
+                    female_responses_array[position] = resp_value
+                    female_answered[position] = True
             
-            # Pad or truncate to expected number of responses
-            while len(questionnaire_responses) < total_expected_responses:
-                questionnaire_responses.append(3)  # Default to neutral
-            questionnaire_responses = questionnaire_responses[:total_expected_responses]
+            # Also build combined questionnaire_responses (for backward compatibility)
+            # Consider partner disagreements as indicators of conflict: significant disagreement takes the lower
+            # response, otherwise the rounded average; a single answer is used as-is, neither answer is neutral (3)
+            both_answered = male_answered & female_answered
+            partner_gap = np.abs(male_responses_array - female_responses_array)
+            combined = np.where(
+                partner_gap >= 2,
+                np.minimum(male_responses_array, female_responses_array),
+                np.round((male_responses_array + female_responses_array) / 2)
+            )
+            questionnaire_responses = np.where(
+                both_answered, combined,
+                np.where(male_answered, male_responses_array, np.where(female_answered, female_responses_array, 3))
+            ).astype(np.int8)
             
             # Calculate risk level based on actual responses
             # NOTE: This is a heuristic for LABELING training data only
@@ -1196,9 +1377,11 @@ def load_real_couples_for_training():
             # For actual predictions, the ML model is used (see analyze() function)
             # More disagreements = higher risk
             # Also count neutral responses (3) as potential issues if they're from disagreements
-            disagree_count = sum(1 for r in questionnaire_responses if r == 2)
-            neutral_count = sum(1 for r in questionnaire_responses if r == 3)
-            agree_count = sum(1 for r in questionnaire_responses if r == 4)
+            disagree_mask = questionnaire_responses == 2
+            neutral_mask = questionnaire_responses == 3
+            disagree_count = int(np.count_nonzero(disagree_mask))
+            neutral_count = int(np.count_nonzero(neutral_mask))
+            agree_count = int(np.count_nonzero(questionnaire_responses == 4))
             # Count neutral as partial disagreement (they might indicate unresolved issues)
             weighted_disagree_count = disagree_count + (neutral_count * 0.3)
             disagree_ratio = weighted_disagree_count / len(questionnaire_responses) if len(questionnaire_responses) > 0 else 0
@@ -1224,40 +1407,21 @@ def load_real_couples_for_training():
                 print(f"  → Risk Level: LOW (disagree_ratio {disagree_ratio:.3f} <= 0.20)")
             
             # Generate category scores based on actual question-category mapping
-            category_scores = []
+            # QUESTION_CAT_IDS holds the category of each response position (question_id - 1)
+            num_categories = len(MEAI_CATEGORIES)
+            response_categories = QUESTION_CAT_IDS[:len(questionnaire_responses)].astype(np.intp) - 1
+            answered = slice(0, len(response_categories))
+            cat_question_counts = np.bincount(response_categories, minlength=num_categories)[:num_categories]
+            # Count both disagreements and neutrals (which may indicate unresolved issues)
+            cat_disagree_counts = np.bincount(response_categories, weights=disagree_mask[answered], minlength=num_categories)[:num_categories]
+            cat_neutral_counts = np.bincount(response_categories, weights=neutral_mask[answered], minlength=num_categories)[:num_categories]
             
-            for category_id in range(1, len(MEAI_CATEGORIES) + 1):
-                # Get questions for this category
-                category_question_ids = [qid for qid, cid in MEAI_QUESTION_MAPPING.items() if cid == category_id]
-                
-                if not category_question_ids:
-                    category_scores.append(0.5)  # Default score if no questions
-                    continue
-                
-                # Get responses for questions in this category
-                category_responses = []
-                for qid in category_question_ids:
-                    # Find response index for this question
-                    # Note: This assumes responses are ordered by question_id
-                    if qid <= len(questionnaire_responses):
-                        category_responses.append(questionnaire_responses[qid - 1])  # question_id is 1-indexed
-                
-                if not category_responses:
-                    category_scores.append(0.5)  # Default score if no responses
-                    continue
-                
-                # Calculate disagreement ratio for this category
-                # Count both disagreements and neutrals (which may indicate unresolved issues)
-                cat_disagree_count = sum(1 for r in category_responses if r == 2)
-                cat_neutral_count = sum(1 for r in category_responses if r == 3)
-                # Weight neutrals as partial disagreements
-                weighted_disagree_count = cat_disagree_count + (cat_neutral_count * 0.3)
-                cat_disagree_ratio = weighted_disagree_count / len(category_responses) if len(category_responses) > 0 else 0
-                
-                # Convert to 0-1 score (higher disagreement = higher score)
-                # Use a better scaling function to capture more nuance
-                category_score = min(1.0, cat_disagree_ratio * 2.5)  # Increased from 2.0 to 2.5 for better sensitivity
-                category_scores.append(category_score)
+            # Weight neutrals as partial disagreements, then convert to 0-1 score (higher disagreement = higher score)
+            # Use a better scaling function to capture more nuance (2.5 instead of 2.0 for better sensitivity)
+            cat_disagree_ratios = (cat_disagree_counts + cat_neutral_counts * 0.3) / np.maximum(cat_question_counts, 1)
+            category_scores = np.where(
+                cat_question_counts > 0, np.minimum(1.0, cat_disagree_ratios * 2.5), 0.5  # Default score if no questions
+            )
             
             # Map education and income to numeric levels
             education_level = education_mapping.get(education, 2) if education else 2
@@ -1285,34 +1449,54 @@ def load_real_couples_for_training():
                 except (ValueError, TypeError):
                     years_together_int = 0
             
-            training_data.append({
-                'male_age': male_age,
-                'female_age': female_age,
-                'civil_status': civil_status or 'Single',
-                'years_living_together': years_together_int,
-                'past_children': past_children_bool,
-                'children': int(children) if children else 0,
-                'education_level': education_level,
-                'income_level': income_level,
-                'questionnaire_responses': questionnaire_responses,  # Keep for backward compatibility
-                'male_responses': male_responses_array,  # CRITICAL: Separate male responses (59 features)
-                'female_responses': female_responses_array,  # CRITICAL: Separate female responses (59 features)
-                'risk_level': risk_level,
-                'category_scores': category_scores
-            })
-        
+            male_ages.append(male_age)
+            female_ages.append(female_age)
+            civil_statuses.append(civil_status or 'Single')
+            years_together_values.append(years_together_int)
+            past_children_flags.append(past_children_bool)
+            children_counts.append(int(children) if children else 0)
+            education_levels.append(education_level)
+            income_levels.append(income_level)
+            questionnaire_rows.append(questionnaire_responses)  # Keep for backward compatibility
+            male_response_rows.append(male_responses_array)  # CRITICAL: Separate male responses (59 features)
+            female_response_rows.append(female_responses_array)  # CRITICAL: Separate female responses (59 features)
+            risk_codes.append(RISK_LEVELS.index(risk_level))
+            category_score_rows.append(category_scores)
+        
+        response_cursor.close()
         conn.close()
-        print(f"Loaded {len(training_data)} real couples for training")
-        return training_data
+        print(f"Loaded {len(risk_codes)} real couples for training")
+        if not risk_codes:
+            return None
+        
+        # Same columnar layout as the synthetic generators: one array per field, (N, Q) response matrices
+        return {
+            'male_age': np.asarray(male_ages, dtype=np.int16),
+            'female_age': np.asarray(female_ages, dtype=np.int16),
+            'civil_status': np.asarray(civil_statuses),
+            'years_living_together': np.asarray(years_together_values, dtype=np.int16),
+            'past_children': np.asarray(past_children_flags, dtype=bool),
+            'children': np.asarray(children_counts, dtype=np.int8),
+            'education_level': np.asarray(education_levels, dtype=np.int8),
+            'income_level': np.asarray(income_levels, dtype=np.int8),
+            'questionnaire_responses': np.stack(questionnaire_rows),
+            'male_responses': np.stack(male_response_rows),
+            'female_responses': np.stack(female_response_rows),
+            'risk_level': np.asarray(risk_codes, dtype=np.int8),
+            'category_scores': np.stack(category_score_rows)
+        }
         
     except Exception as e:
         print(f"Error loading real couples: {e}")
-        return []
+        return None
 
 def train_ml_models():
     """Train machine learning models"""
     print("Training ML models...")
     
+    # All synthetic draws (personalized features, missing-class and SMOTE fill-ins) come from one seeded Generator
+    rng = np.random.default_rng(42)
+    
     # Update progress: Loading questions and categories
     with training_lock:
         training_status['progress'] = 15
@@ -1334,199 +1518,114 @@ def train_ml_models():
     
     # Always generate synthetic data (500 couples)
     # If we have real couples, use them to inform the synthetic generation
-    if not real_couples_data:
+    # All data sets are columnar: one NumPy array per field, (N, Q) response matrices
+    if real_couples_data is None:
         print("No real couples found, using generic synthetic data")
         synthetic_data = generate_synthetic_data(500)
         data = synthetic_data
     else:
-        print(f"Found {len(real_couples_data)} real couples")
+        num_real_couples = count_training_couples(real_couples_data)
+        print(f"Found {num_real_couples} real couples")
         print(f"Generating 500 synthetic couples based on real couple patterns")
         # Generate 500 synthetic couples based on real couple patterns
         synthetic_data = generate_synthetic_data_based_on_real_couples(500, real_couples_data)
         
         # Combine real couples with synthetic data
-        print(f"Combining {len(real_couples_data)} real couples with {len(synthetic_data)} synthetic couples")
-        data = real_couples_data + synthetic_data
-        print(f"Total training data: {len(data)} couples (real + synthetic)")
+        print(f"Combining {num_real_couples} real couples with {count_training_couples(synthetic_data)} synthetic couples")
+        data = concat_training_columns(real_couples_data, synthetic_data)
+        print(f"Total training data: {count_training_couples(data)} couples (real + synthetic)")
         
         # DIAGNOSTIC: Check risk level distribution
-        from collections import Counter
-        real_risk_dist = Counter([c['risk_level'] for c in real_couples_data])
-        synthetic_risk_dist = Counter([c['risk_level'] for c in synthetic_data])
-        total_risk_dist = Counter([c['risk_level'] for c in data])
+        real_risk_dist = risk_level_distribution(real_couples_data['risk_level'])
+        synthetic_risk_dist = risk_level_distribution(synthetic_data['risk_level'])
+        total_risk_dist = risk_level_distribution(data['risk_level'])
         
         print(f"\n=== RISK LEVEL DISTRIBUTION ===")
-        print(f"Real couples: {dict(real_risk_dist)}")
-        print(f"Synthetic couples: {dict(synthetic_risk_dist)}")
-        print(f"Total training data: {dict(total_risk_dist)}")
+        print(f"Real couples: {real_risk_dist}")
+        print(f"Synthetic couples: {synthetic_risk_dist}")
+        print(f"Total training data: {total_risk_dist}")
         print(f"===============================\n")
         
         # WARNING: If all real couples are Low Risk, this might bias the model
         if len(real_risk_dist) == 1 and 'Low' in real_risk_dist:
-            print(f"⚠️  WARNING: All {len(real_couples_data)} real couples are classified as LOW RISK!")
+            print(f"⚠️  WARNING: All {num_real_couples} real couples are classified as LOW RISK!")
             print(f"⚠️  This may bias the model towards predicting Low Risk for similar couples.")
             print(f"⚠️  Consider reviewing the risk calculation thresholds or couple responses.\n")
     
-    df = pd.DataFrame(data)
-    
     # Update progress: Preparing features
     with training_lock:
         training_status['progress'] = 25
         training_status['message'] = 'Preparing features and encoding data...'
     
-    # Prepare features
-    X = []
-    y_risk = []
-    y_categories = []
-    
-    total_rows = len(df)
-    for idx, row in df.iterrows():
-        # Update progress during feature preparation (25-35%)
-        if idx % 50 == 0:
-            progress = 25 + int((idx / total_rows) * 10)
-            with training_lock:
-                training_status['progress'] = progress
-                training_status['message'] = f'Preparing features... ({idx}/{total_rows} couples)'
-        # NEW: Calculate age gap
-        age_gap = abs(row['male_age'] - row['female_age'])
-        
-        # NEW: Calculate education/income compatibility
-        education_income_diff = abs(row['education_level'] - row['income_level'])
-        
-        # NEW: Civil status encoding (one-hot: 3 features)
-        civil_status = row.get('civil_status', 'Single')
-        is_single = 1 if civil_status == 'Single' else 0
-        is_living_in = 1 if civil_status == 'Living In' else 0
-        is_separated_divorced = 1 if civil_status in ['Separated', 'Divorced', 'Widowed'] else 0
-        
-        # NEW: Encode employment status (use male partner's employment status)
-        employment_status = row.get('employment_status', 'Unemployed')
-        if employment_status == 'Employed':
-            employment_encoded = 1
-        elif employment_status == 'Self-employed':
-            employment_encoded = 2
-        else:  # Unemployed or unknown
-            employment_encoded = 0
-        
-        # Combine all features (same structure as analysis)
-        features = [
-            row['male_age'],
-            row['female_age'],
-            age_gap,
-            row['years_living_together'],
-            row['education_level'],
-            row['income_level'],
-            education_income_diff,
-            is_single,
-            is_living_in,
-            is_separated_divorced,
-            employment_encoded  # NEW: Employment status
-            # REMOVED: children feature
-        ]
-        
-        # CRITICAL: Use separate male_responses + female_responses (118 features: 59 + 59)
-        # This is REQUIRED for training - no fallback to questionnaire_responses
-        # Training data must include separate male_responses and female_responses
-        if 'male_responses' not in row or 'female_responses' not in row:
-            print(f"ERROR - Training data missing male_responses or female_responses!")
-            print(f"ERROR - Available keys: {list(row.keys())}")
-            raise ValueError("Training data must include separate male_responses and female_responses (from respondent field)")
-        
-        male_responses = row['male_responses']
-        female_responses = row['female_responses']
-        
-        # Validate arrays exist and have correct length
-        if not male_responses or len(male_responses) == 0:
-            raise ValueError(f"male_responses is empty for training sample")
-        if not female_responses or len(female_responses) == 0:
-            raise ValueError(f"female_responses is empty for training sample")
-        
-        expected_count = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 59
-        if len(male_responses) != expected_count:
-            raise ValueError(f"male_responses length ({len(male_responses)}) does not match expected ({expected_count})")
-        if len(female_responses) != expected_count:
-            raise ValueError(f"female_responses length ({len(female_responses)}) does not match expected ({expected_count})")
-        
-        # Add separate responses (118 features total: 59 male + 59 female)
-        if isinstance(male_responses, np.ndarray):
-            features.extend(male_responses.tolist())
-        else:
-            features.extend(male_responses)
-        if isinstance(female_responses, np.ndarray):
-            features.extend(female_responses.tolist())
-        else:
-            features.extend(female_responses)
-        
-        print(f"DEBUG - Training: Added {len(male_responses)} male + {len(female_responses)} female = {len(male_responses) + len(female_responses)} response features")
-        
-        # Add personalized features (synthetic for training)
-        # Generate synthetic personalized features based on risk level
-        if row['risk_level'] == 'High':
-            # High risk: low alignment, high conflict
-            alignment_score = np.random.uniform(0.2, 0.5)
-            conflict_ratio = np.random.uniform(0.3, 0.7)
-            # Category alignments: lower for high risk
-            category_alignments = [np.random.uniform(0.2, 0.5) for _ in range(4)]
-            # More extreme responses for high risk
-            male_agree_ratio = np.random.uniform(0.1, 0.3)
-            male_disagree_ratio = np.random.uniform(0.3, 0.5)
-            female_agree_ratio = np.random.uniform(0.1, 0.3)
-            female_disagree_ratio = np.random.uniform(0.3, 0.5)
-        elif row['risk_level'] == 'Low':
-            # Low risk: high alignment, low conflict
-            alignment_score = np.random.uniform(0.6, 0.9)
-            conflict_ratio = np.random.uniform(0.0, 0.2)
-            # Category alignments: higher for low risk
-            category_alignments = [np.random.uniform(0.6, 0.9) for _ in range(4)]
-            # More balanced responses for low risk
-            male_agree_ratio = np.random.uniform(0.4, 0.6)
-            male_disagree_ratio = np.random.uniform(0.0, 0.2)
-            female_agree_ratio = np.random.uniform(0.4, 0.6)
-            female_disagree_ratio = np.random.uniform(0.0, 0.2)
-        else:  # Medium
-            # Medium risk: mixed patterns
-            alignment_score = np.random.uniform(0.4, 0.7)
-            conflict_ratio = np.random.uniform(0.1, 0.4)
-            # Category alignments: mixed
-            category_alignments = [np.random.uniform(0.3, 0.7) for _ in range(4)]
-            # Moderate extreme responses
-            male_agree_ratio = np.random.uniform(0.2, 0.5)
-            male_disagree_ratio = np.random.uniform(0.1, 0.3)
-            female_agree_ratio = np.random.uniform(0.2, 0.5)
-            female_disagree_ratio = np.random.uniform(0.1, 0.3)
-        
-        # Add personalized features to match analysis structure (6 features)
-        personalized_features = [
-            alignment_score,
-            conflict_ratio,
-            # Category-specific alignments (4 features, one per MEAI category)
-            *category_alignments
-            # REMOVED: male_avg_response, female_avg_response, male_agree_ratio, male_disagree_ratio, female_agree_ratio, female_disagree_ratio
-        ]
-        
-        features.extend(personalized_features)
-        
-        X.append(features)
-        
-        # Risk level encoding
-        risk_mapping = {'Low': 0, 'Medium': 1, 'High': 2}
-        y_risk.append(risk_mapping[row['risk_level']])
-        
-        # Category scores (ensure it's a flat list)
-        category_scores = row['category_scores']
-        if isinstance(category_scores, np.ndarray):
-            y_categories.append(category_scores.tolist())
-        elif isinstance(category_scores, list):
-            y_categories.append(category_scores)
-        else:
-            # Convert to list if it's not already
-            y_categories.append(list(category_scores))
-    
-    # Convert to numpy arrays AFTER the loop completes
-    X = np.array(X)
-    y_risk = np.array(y_risk)
-    y_categories = np.array(y_categories)
+    # Prepare features straight from the training columns (same structure as analysis):
+    # 11 demographic features + male/female responses + 6 personalized features
+    total_rows = count_training_couples(data)
+    expected_count = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 59
+    num_features = 11 + 2 * expected_count + PERSONALIZED_FEATURE_LOW.shape[1]
+    X = np.empty((total_rows, num_features), dtype=np.float32)
+    
+    male_columns = slice(11, 11 + expected_count)
+    female_columns = slice(11 + expected_count, 11 + 2 * expected_count)
+    
+    male_age = data['male_age'].astype(np.int32)
+    female_age = data['female_age'].astype(np.int32)
+    education_level = data['education_level'].astype(np.int32)
+    income_level = data['income_level'].astype(np.int32)
+    civil_status = data['civil_status']
+    
+    X[:, :11] = np.column_stack((
+        male_age,
+        female_age,
+        np.abs(male_age - female_age),  # NEW: Age gap
+        data['years_living_together'],
+        education_level,
+        income_level,
+        np.abs(education_level - income_level),  # NEW: Education/income compatibility
+        civil_status == 'Single',  # NEW: Civil status encoding (one-hot: 3 features)
+        civil_status == 'Living In',
+        np.isin(civil_status, ['Separated', 'Divorced', 'Widowed']),
+        np.zeros(total_rows)  # NEW: Employment status - not in training data, so Unemployed (0)
+        # REMOVED: children feature
+    ))
+    
+    # CRITICAL: Use separate male_responses + female_responses (118 features: 59 + 59)
+    # This is REQUIRED for training - no fallback to questionnaire_responses
+    # Training data must include separate male_responses and female_responses
+    if 'male_responses' not in data or 'female_responses' not in data:
+        print(f"ERROR - Training data missing male_responses or female_responses!")
+        print(f"ERROR - Available keys: {list(data.keys())}")
+        raise ValueError("Training data must include separate male_responses and female_responses (from respondent field)")
+    
+    male_responses = data['male_responses']
+    female_responses = data['female_responses']
+    
+    # Validate response matrices have one row per couple and the expected number of columns
+    if male_responses.shape != (total_rows, expected_count):
+        raise ValueError(f"male_responses shape {male_responses.shape} does not match expected ({total_rows}, {expected_count})")
+    if female_responses.shape != (total_rows, expected_count):
+        raise ValueError(f"female_responses shape {female_responses.shape} does not match expected ({total_rows}, {expected_count})")
+    
+    # Add separate responses (118 features total: 59 male + 59 female)
+    X[:, male_columns] = male_responses
+    X[:, female_columns] = female_responses
+    
+    # Risk level codes (index into RISK_LEVELS) and category scores (one per MEAI category)
+    y_risk = data['risk_level'].astype(np.int8)
+    y_categories = data['category_scores'].astype(np.float32)
+    
+    print(f"DEBUG - Training: Added {expected_count} male + {expected_count} female = {2 * expected_count} response features per couple")
+    
+    # Add personalized features (synthetic for training), one draw per risk level bucket
+    # (6 features to match analysis structure: alignment_score, conflict_ratio, 4 category alignments)
+    personalized_columns = slice(female_columns.stop, num_features)
+    for risk_code in range(len(PERSONALIZED_FEATURE_LOW)):
+        bucket = np.flatnonzero(y_risk == risk_code)
+        X[bucket, personalized_columns] = rng.uniform(
+            PERSONALIZED_FEATURE_LOW[risk_code], PERSONALIZED_FEATURE_HIGH[risk_code], (len(bucket), PERSONALIZED_FEATURE_LOW.shape[1])
+        )
+    # REMOVED: male_avg_response, female_avg_response, male_agree_ratio, male_disagree_ratio, female_agree_ratio, female_disagree_ratio
     
+
     # Ensure all 3 risk classes are present
     unique_risks = np.unique(y_risk)
     if len(unique_risks) < 3:
@@ -1536,137 +1635,59 @@ def train_ml_models():
         all_risk_classes = {0: 'Low', 1: 'Medium', 2: 'High'}
         missing_classes = [rc for rc in all_risk_classes.keys() if rc not in unique_risks]
         
-        # Generate synthetic samples for missing classes
-        total_questions = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 31
-        synthetic_samples = []
-        synthetic_risks = []
-        synthetic_categories = []
-        
-        for missing_class in missing_classes:
-            risk_name = all_risk_classes[missing_class]
-            # Generate 10 synthetic samples for each missing class
-            for _ in range(10):
-                # Generate ages
-                male_age = np.random.randint(25, 50)
-                female_age = np.random.randint(23, 48)
-                age_gap = abs(male_age - female_age)
-                
-                # Generate other attributes
-                civil_status = np.random.choice(['Single', 'Living In', 'Widowed'])
-                years_living_together = np.random.randint(0, 10) if civil_status == 'Living In' else 0
-                children = np.random.randint(0, 3)
-                education_level = np.random.randint(0, 4)
-                income_level = np.random.randint(0, 4)
-                education_income_diff = abs(education_level - income_level)
-                
-                # Civil status encoding
-                is_single = 1 if civil_status == 'Single' else 0
-                is_living_in = 1 if civil_status == 'Living In' else 0
-                is_separated_divorced = 1 if civil_status in ['Separated', 'Divorced', 'Widowed'] else 0
-                
-                # Generate questionnaire responses based on risk level
-                if risk_name == 'High':
-                    disagree_ratio = np.random.uniform(0.30, 0.60)
-                elif risk_name == 'Medium':
-                    disagree_ratio = np.random.uniform(0.15, 0.30)
-                else:  # Low
-                    disagree_ratio = np.random.uniform(0.0, 0.15)
-                
-                disagree_count = int(total_questions * disagree_ratio)
-                agree_count = int(total_questions * (1 - disagree_ratio) * 0.6)
-                neutral_count = total_questions - disagree_count - agree_count
-                
-                questionnaire_responses = [2] * disagree_count + [4] * agree_count + [3] * neutral_count
-                np.random.shuffle(questionnaire_responses)
-                
-                # Generate category scores based on risk level
-                if risk_name == 'High':
-                    category_scores = [np.random.uniform(0.5, 1.0) for _ in range(len(MEAI_CATEGORIES))]
-                elif risk_name == 'Medium':
-                    category_scores = [np.random.uniform(0.3, 0.7) for _ in range(len(MEAI_CATEGORIES))]
-                else:  # Low
-                    category_scores = [np.random.uniform(0.0, 0.5) for _ in range(len(MEAI_CATEGORIES))]
-                
-                # CRITICAL: Generate separate male_responses and female_responses
-                # Start with questionnaire_responses, then add variation
-                male_responses_synth = questionnaire_responses.copy()
-                female_responses_synth = questionnaire_responses.copy()
-                
-                # Add variation between partners (simulate real couple differences)
-                for j in range(len(questionnaire_responses)):
-                    # 30% chance of partner disagreement (difference of 1)
-                    if np.random.random() < 0.3:
-                        if np.random.random() < 0.5:
-                            male_responses_synth[j] = max(2, min(4, male_responses_synth[j] + np.random.choice([-1, 1])))
-                        else:
-                            female_responses_synth[j] = max(2, min(4, female_responses_synth[j] + np.random.choice([-1, 1])))
-                    # 10% chance of significant disagreement (difference of 2)
-                    elif np.random.random() < 0.1:
-                        if np.random.random() < 0.5:
-                            male_responses_synth[j] = max(2, min(4, male_responses_synth[j] + np.random.choice([-2, 2])))
-                        else:
-                            female_responses_synth[j] = max(2, min(4, female_responses_synth[j] + np.random.choice([-2, 2])))
-                
-                # Build features (11 demographic features - REMOVED: children)
-                features = [
-                    male_age, female_age, age_gap, years_living_together,
-                    education_level, income_level, education_income_diff,
-                    is_single, is_living_in, is_separated_divorced,
-                    0  # employment_encoded (default to Unemployed for synthetic)
-                ]
-                
-                # Add separate male_responses and female_responses (118 features: 59 + 59)
-                features.extend(male_responses_synth)
-                features.extend(female_responses_synth)
-                
-                # Add personalized features
-                if risk_name == 'High':
-                    alignment_score = np.random.uniform(0.2, 0.5)
-                    conflict_ratio = np.random.uniform(0.3, 0.7)
-                    category_alignments = [np.random.uniform(0.2, 0.5) for _ in range(4)]
-                    male_agree_ratio = np.random.uniform(0.1, 0.3)
-                    male_disagree_ratio = np.random.uniform(0.3, 0.5)
-                    female_agree_ratio = np.random.uniform(0.1, 0.3)
-                    female_disagree_ratio = np.random.uniform(0.3, 0.5)
-                elif risk_name == 'Low':
-                    alignment_score = np.random.uniform(0.6, 0.9)
-                    conflict_ratio = np.random.uniform(0.0, 0.2)
-                    category_alignments = [np.random.uniform(0.6, 0.9) for _ in range(4)]
-                    male_agree_ratio = np.random.uniform(0.4, 0.6)
-                    male_disagree_ratio = np.random.uniform(0.0, 0.2)
-                    female_agree_ratio = np.random.uniform(0.4, 0.6)
-                    female_disagree_ratio = np.random.uniform(0.0, 0.2)
-                else:  # Medium
-                    alignment_score = np.random.uniform(0.4, 0.7)
-                    conflict_ratio = np.random.uniform(0.1, 0.4)
-                    category_alignments = [np.random.uniform(0.3, 0.7) for _ in range(4)]
-                    # REMOVED: male_agree_ratio, male_disagree_ratio, female_agree_ratio, female_disagree_ratio
-                
-                personalized_features = [
-                    alignment_score,
-                    conflict_ratio,
-                    *category_alignments  # 4 category alignments
-                    # REMOVED: male_avg_response, female_avg_response, agree/disagree ratios
-                ]
-                
-                features.extend(personalized_features)
-                
-                synthetic_samples.append(features)
-                synthetic_risks.append(missing_class)
-                synthetic_categories.append(category_scores)
+        # Generate 10 synthetic samples for each missing class, every field drawn in bulk
+        y_risk_synthetic = np.repeat(np.array(missing_classes, dtype=y_risk.dtype), 10)
+        num_samples = len(y_risk_synthetic)
+        
+        # Generate ages and other attributes
+        male_age = rng.integers(25, 50, num_samples)
+        female_age = rng.integers(23, 48, num_samples)
+        civil_status = rng.choice(['Single', 'Living In', 'Widowed'], num_samples)
+        years_living_together = np.where(civil_status == 'Living In', rng.integers(0, 10, num_samples), 0)
+        education_level = rng.integers(0, 4, num_samples)
+        income_level = rng.integers(0, 4, num_samples)
+        
+        # Generate questionnaire responses based on risk level (Low 0-15%, Medium 15-30%, High 30-60% disagree)
+        disagree_ratio = rng.uniform(np.array([0.0, 0.15, 0.30])[y_risk_synthetic], np.array([0.15, 0.30, 0.60])[y_risk_synthetic])
+        disagree_count = (expected_count * disagree_ratio).astype(int)
+        agree_count = (expected_count * (1 - disagree_ratio) * 0.6).astype(int)
+        position = np.arange(expected_count)
+        questionnaire_responses = np.where(
+            position < disagree_count[:, None], 2,
+            np.where(position < (disagree_count + agree_count)[:, None], 4, 3)
+        ).astype(np.int8)
+        questionnaire_responses = rng.permuted(questionnaire_responses, axis=1)
+        
+        # CRITICAL: Generate separate male_responses and female_responses (simulate real couple differences)
+        male_responses_synth, female_responses_synth = add_partner_variation(questionnaire_responses, rng)
+        
+        # Build features (11 demographic features - REMOVED: children)
+        X_synthetic = np.empty((num_samples, X.shape[1]), dtype=X.dtype)
+        X_synthetic[:, :11] = np.column_stack((
+            male_age, female_age, np.abs(male_age - female_age), years_living_together,
+            education_level, income_level, np.abs(education_level - income_level),
+            civil_status == 'Single', civil_status == 'Living In', civil_status == 'Widowed',
+            np.zeros(num_samples)  # employment_encoded (default to Unemployed for synthetic)
+        ))
+        
+        # Add separate male_responses and female_responses (118 features: 59 + 59)
+        X_synthetic[:, male_columns] = male_responses_synth
+        X_synthetic[:, female_columns] = female_responses_synth
+        
+        # Add personalized features and category scores based on risk level
+        X_synthetic[:, personalized_columns] = rng.uniform(PERSONALIZED_FEATURE_LOW[y_risk_synthetic], PERSONALIZED_FEATURE_HIGH[y_risk_synthetic])
+        y_categories_synthetic = rng.uniform(
+            SYNTHETIC_CATEGORY_SCORE_LOW[y_risk_synthetic, None], SYNTHETIC_CATEGORY_SCORE_HIGH[y_risk_synthetic, None],
+            (num_samples, y_categories.shape[1])
+        ).astype(y_categories.dtype)
         
         # Add synthetic samples to training data
-        if synthetic_samples:
-            X_synthetic = np.array(synthetic_samples)
-            y_risk_synthetic = np.array(synthetic_risks)
-            y_categories_synthetic = np.array(synthetic_categories)
-            
-            X = np.vstack([X, X_synthetic])
-            y_risk = np.concatenate([y_risk, y_risk_synthetic])
-            y_categories = np.vstack([y_categories, y_categories_synthetic])
-            
-            print(f"Added {len(synthetic_samples)} synthetic samples to ensure all risk classes are represented")
-            print(f"Final class distribution: {np.bincount(y_risk)}")
+        X = np.vstack([X, X_synthetic])
+        y_risk = np.concatenate([y_risk, y_risk_synthetic])
+        y_categories = np.vstack([y_categories, y_categories_synthetic])
+        
+        print(f"Added {num_samples} synthetic samples to ensure all risk classes are represented")
+        print(f"Final class distribution: {np.bincount(y_risk)}")
     
     # Update progress: Validating data
     with training_lock:
@@ -1691,7 +1712,7 @@ def train_ml_models():
     print(f"Training with {X.shape[1]} features: {X.shape[0]} samples")
     
     # Track original data composition for logging
-    num_real_couples = len(real_couples_data) if real_couples_data else 0
+    num_real_couples = count_training_couples(real_couples_data) if real_couples_data is not None else 0
     num_synthetic_couples = 500  # Always 500 synthetic couples
     print(f"Data composition: {num_real_couples} real couples + {num_synthetic_couples} synthetic couples = {X.shape[0]} total")
     class_dist_before = np.bincount(y_risk)
@@ -1736,18 +1757,15 @@ def train_ml_models():
             
             if resampled_size > original_size:
                 # New synthetic samples were added - generate matching category scores
-                y_categories_resampled = np.zeros((resampled_size, y_categories.shape[1]))
+                y_categories_resampled = np.zeros((resampled_size, y_categories.shape[1]), dtype=y_categories.dtype)
                 y_categories_resampled[:original_size] = y_categories
                 
-                # For synthetic samples, generate category scores based on their risk level
-                for i in range(original_size, resampled_size):
-                    risk_class = y_risk_resampled[i]
-                    if risk_class == 2:  # High risk
-                        y_categories_resampled[i] = np.random.uniform(0.5, 1.0, y_categories.shape[1])
-                    elif risk_class == 1:  # Medium risk
-                        y_categories_resampled[i] = np.random.uniform(0.3, 0.7, y_categories.shape[1])
-                    else:  # Low risk
-                        y_categories_resampled[i] = np.random.uniform(0.0, 0.5, y_categories.shape[1])
+                # For synthetic samples, generate category scores based on their risk level (one bulk draw)
+                new_risks = y_risk_resampled[original_size:]
+                y_categories_resampled[original_size:] = rng.uniform(
+                    SYNTHETIC_CATEGORY_SCORE_LOW[new_risks, None], SYNTHETIC_CATEGORY_SCORE_HIGH[new_risks, None],
+                    (resampled_size - original_size, y_categories.shape[1])
+                )
             else:
                 # Some samples were removed (Tomek links) - keep matching ones
                 # This is a simplified approach - in practice, we'd track which samples were kept
@@ -1756,8 +1774,9 @@ def train_ml_models():
             print(f"After SMOTE: {X_resampled.shape[0]} samples (was {X.shape[0]})")
             print(f"Class distribution after SMOTE: {np.bincount(y_risk_resampled)}")
             
-            X = X_resampled
-            y_risk = y_risk_resampled
+            # Keep the training dtypes (float32 features, matching inference rows) through resampling
+            X = X_resampled.astype(X.dtype, copy=False)
+            y_risk = y_risk_resampled.astype(y_risk.dtype, copy=False)
             y_categories = y_categories_resampled
         except Exception as e:
             print(f"SMOTE failed (using original data): {e}")
@@ -1782,13 +1801,15 @@ def train_ml_models():
     # Hyperparameter tuning for risk model
     print("Tuning hyperparameters for risk model...")
     risk_param_grid = {
-        'n_estimators': [100, 200],
-        'max_depth': [10, 15, None],
-        'min_samples_split': [2, 5],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [3, 6],
+        'min_samples_leaf': [10, 20],
         'class_weight': ['balanced', class_weight_dict]
     }
     
-    risk_base_model = RandomForestClassifier(random_state=42)
+    # Histogram gradient boosting: binned features and early stopping give far fewer, shallower trees
+    # than a 100-200 tree forest, so the saved model is smaller and predict_proba is faster
+    risk_base_model = HistGradientBoostingClassifier(max_iter=200, early_stopping=True, random_state=42)
     risk_grid_search = GridSearchCV(
         risk_base_model,
         risk_param_grid,
@@ -1816,12 +1837,13 @@ def train_ml_models():
     # Hyperparameter tuning for category model
     print("Tuning hyperparameters for category model...")
     category_param_grid = {
-        'estimator__n_estimators': [100, 200],
-        'estimator__max_depth': [10, 15, None],
-        'estimator__min_samples_split': [2, 5]
+        'n_estimators': [100, 200],
+        'max_depth': [10, 15, None],
+        'min_samples_split': [2, 5]
     }
     
-    category_base_model = MultiOutputRegressor(RandomForestRegressor(random_state=42))
+    # One forest predicts all category scores (trees split on the combined multi-output impurity)
+    category_base_model = RandomForestRegressor(random_state=42, n_jobs=-1)
     category_grid_search = GridSearchCV(
         category_base_model,
         category_param_grid,
@@ -1850,6 +1872,10 @@ def train_ml_models():
     risk_cv_scores = cross_val_score(risk_model, X, y_risk, cv=5, scoring='accuracy')
     print(f"Risk model CV accuracy: {risk_cv_scores.mean():.3f} (+/- {risk_cv_scores.std() * 2:.3f})")
     
+    # Single-row predictions are faster without joblib dispatch
+    set_serial_predict(risk_model)
+    set_serial_predict(category_model)
+    
     # Create risk encoder
     risk_encoder = LabelEncoder()
     risk_encoder.fit(['Low', 'Medium', 'High'])
@@ -1863,23 +1889,26 @@ def train_ml_models():
     ml_models['risk_model'] = risk_model
     ml_models['category_model'] = category_model
     ml_models['risk_encoder'] = risk_encoder
+    update_models_ready()
+    predict_row_cached.cache_clear()
+    
+    # Compiled predictors belong to the previous models until re-exported below
+    for name in onnx_sessions:
+        onnx_sessions[name] = None
+    native_predictors['risk_model'] = None
     
     # Save to files - use ml_model folder (where this script is located)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
     try:
-        risk_model_path = os.path.join(script_dir, 'risk_model.pkl')
-        category_model_path = os.path.join(script_dir, 'category_model.pkl')
-        risk_encoder_path = os.path.join(script_dir, 'risk_encoder.pkl')
-        
-        with open(risk_model_path, 'wb') as f:
-            pickle.dump(risk_model, f)
-        
-        with open(category_model_path, 'wb') as f:
-            pickle.dump(category_model, f)
+        save_model_file(os.path.join(script_dir, 'risk_model.joblib'), risk_model)
+        save_model_file(os.path.join(script_dir, 'category_model.joblib'), category_model)
+        save_model_file(os.path.join(script_dir, 'risk_encoder.joblib'), risk_encoder)
         
-        with open(risk_encoder_path, 'wb') as f:
-            pickle.dump(risk_encoder, f)
+        # Re-export ONNX files and the native risk library so inference matches the freshly trained models
+        load_onnx_sessions(script_dir, force_export=True)
+        load_native_risk_predictor(script_dir, force_compile=True)
+        predict_row_cached.cache_clear()
         
         # Update progress: Complete
         with training_lock:
@@ -1899,34 +1928,42 @@ def load_ml_models():
     # Get the directory where this script is located (ml_model folder)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    risk_model_path = os.path.join(script_dir, 'risk_model.pkl')
-    category_model_path = os.path.join(script_dir, 'category_model.pkl')
-    risk_encoder_path = os.path.join(script_dir, 'risk_encoder.pkl')
+    risk_model_path = model_file_path(script_dir, 'risk_model')
+    category_model_path = model_file_path(script_dir, 'category_model')
+    risk_encoder_path = model_file_path(script_dir, 'risk_encoder')
+    
+    # Predictions memoized for the previous models no longer apply
+    predict_row_cached.cache_clear()
     
     try:
         if os.path.exists(risk_model_path):
-            with open(risk_model_path, 'rb') as f:
-                ml_models['risk_model'] = pickle.load(f)
-            print(f"Loaded risk_model.pkl from {script_dir}")
+            ml_models['risk_model'] = load_model_file(risk_model_path)
+            set_serial_predict(ml_models['risk_model'])
+            print(f"Loaded {os.path.basename(risk_model_path)} from {script_dir}")
         else:
-            print(f"Warning: risk_model.pkl not found in {script_dir}")
+            print(f"Warning: risk_model.joblib/.pkl not found in {script_dir}")
         
         if os.path.exists(category_model_path):
-            with open(category_model_path, 'rb') as f:
-                ml_models['category_model'] = pickle.load(f)
-            print(f"Loaded category_model.pkl from {script_dir}")
+            ml_models['category_model'] = load_model_file(category_model_path)
+            set_serial_predict(ml_models['category_model'])
+            print(f"Loaded {os.path.basename(category_model_path)} from {script_dir}")
         else:
-            print(f"Warning: category_model.pkl not found in {script_dir}")
+            print(f"Warning: category_model.joblib/.pkl not found in {script_dir}")
         
         if os.path.exists(risk_encoder_path):
-            with open(risk_encoder_path, 'rb') as f:
-                ml_models['risk_encoder'] = pickle.load(f)
-            print(f"Loaded risk_encoder.pkl from {script_dir}")
+            ml_models['risk_encoder'] = load_model_file(risk_encoder_path)
+            print(f"Loaded {os.path.basename(risk_encoder_path)} from {script_dir}")
         else:
-            print(f"Warning: risk_encoder.pkl not found in {script_dir}")
+            print(f"Warning: risk_encoder.joblib/.pkl not found in {script_dir}")
         
         if ml_models.get('risk_model') and ml_models.get('category_model') and ml_models.get('risk_encoder'):
             print("All ML models loaded successfully")
+            load_onnx_sessions(script_dir)
+            
+            # Compiling the shared library takes a while, so do it off the startup path
+            # (ONNX/sklearn serve predictions until it is ready)
+            if TREELITE_AVAILABLE:
+                threading.Thread(target=load_native_risk_predictor, args=(script_dir,), daemon=True).start()
             return True
         else:
             print("Error: Not all models were loaded")
@@ -1934,7 +1971,294 @@ def load_ml_models():
     except Exception as e:
         print(f"Error loading ML models: {e}")
         return False
+    finally:
+        update_models_ready()
+
+
+def load_metadata_from_db():
+    """Load MEAI categories, then the questions indexed against them"""
+    load_categories_from_db()
+    load_questions_from_db()
+
+def warm_up_service():
+    """Run the startup loaders concurrently before serving: DB metadata on one worker, ML models on another"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(load_metadata_from_db), executor.submit(load_ml_models)]
+        for future in futures:
+            future.result()
+
+def model_file_path(script_dir, name):
+    """Path of a saved model: name.joblib, or the legacy name.pkl when no joblib dump exists"""
+    joblib_path = os.path.join(script_dir, f'{name}.joblib')
+    return joblib_path if os.path.exists(joblib_path) else os.path.join(script_dir, f'{name}.pkl')
+
+def save_model_file(path, model):
+    """Dump a model uncompressed (so it can be memory-mapped), replacing the file atomically"""
+    # A new inode keeps arrays still mapped from the previous file valid
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+def load_model_file(path):
+    """Load a saved model; joblib dumps have their NumPy arrays memory-mapped read-only"""
+    if path.endswith('.joblib'):
+        return joblib.load(path, mmap_mode='r')
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def set_serial_predict(model):
+    """Set n_jobs=1 on a fitted model that has it so predict skips joblib"""
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
 
+def forest_predict(forest, features_array):
+    """Average tree predictions directly (same result as predict, without per-call validation)"""
+    predictions = forest.estimators_[0].predict(features_array, check_input=False)
+    for tree in forest.estimators_[1:]:
+        predictions += tree.predict(features_array, check_input=False)
+    return predictions / len(forest.estimators_)
+
+def category_output_count(model):
+    """Number of category scores the category model predicts (multi-output forest or legacy MultiOutputRegressor)"""
+    return model.n_outputs_ if hasattr(model, 'n_outputs_') else len(model.estimators_)
+
+def export_onnx_model(name, model, onnx_path):
+    """Convert a fitted model to ONNX and write it to onnx_path"""
+    # zipmap=False keeps classifier probabilities as a plain (N, classes) tensor
+    options = {id(model): {'zipmap': False}} if name == 'risk_model' else None
+    # The converter types a multi-output regressor's output as (N, 1); declare every category column
+    final_types = [('variable', FloatTensorType([None, category_output_count(model)]))] if name == 'category_model' else None
+    onx = convert_sklearn(
+        model, initial_types=[('X', FloatTensorType([None, model.n_features_in_]))],
+        options=options, final_types=final_types
+    )
+    with open(onnx_path, 'wb') as f:
+        f.write(onx.SerializeToString())
+    print(f"Exported {os.path.basename(onnx_path)} to {os.path.dirname(onnx_path)}")
+
+def load_onnx_sessions(script_dir, force_export=False):
+    """Create onnxruntime sessions for the loaded models, exporting .onnx files when missing or stale"""
+    for name in onnx_sessions:
+        onnx_sessions[name] = None
+    
+    if not ONNX_AVAILABLE:
+        return False
+    
+    try:
+        for name in onnx_sessions:
+            model = ml_models[name]
+            onnx_path = os.path.join(script_dir, f'{name}.onnx')
+            model_path = model_file_path(script_dir, name)
+            
+            stale = os.path.exists(onnx_path) and os.path.exists(model_path) and os.path.getmtime(onnx_path) < os.path.getmtime(model_path)
+            if force_export or stale or not os.path.exists(onnx_path):
+                export_onnx_model(name, model, onnx_path)
+            
+            session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+            # Category files exported before the output width was declared are typed (N, 1); export them again
+            if name == 'category_model' and session.get_outputs()[0].shape[-1] != category_output_count(model):
+                export_onnx_model(name, model, onnx_path)
+                session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+            onnx_sessions[name] = session
+        
+        print("ONNX inference sessions ready")
+        return True
+    except Exception as e:
+        print(f"Warning: ONNX inference unavailable, using scikit-learn predict. Error: {e}")
+        for name in onnx_sessions:
+            onnx_sessions[name] = None
+        return False
+
+def hist_gradient_boosting_to_treelite(model):
+    """Treelite model with the same trees as a fitted multi-class HistGradientBoostingClassifier
+    (treelite.sklearn only imports binary ones); one tree per class per iteration, softmax over the class sums"""
+    n_classes = len(model.classes_)
+    # The per-class baseline is folded into the leaves of the first iteration's trees
+    baseline = np.asarray(model._baseline_prediction, dtype=np.float64).ravel()
+    builder = treelite.ModelBuilder(
+        num_feature=model.n_features_in_, num_class=n_classes,
+        threshold_type='float64', leaf_output_type='float64', pred_transform='softmax'
+    )
+    for iteration, predictors in enumerate(model._predictors):
+        for class_index, predictor in enumerate(predictors):
+            bias = baseline[class_index] if iteration == 0 else 0.0
+            tree = treelite.ModelBuilder.Tree(threshold_type='float64', leaf_output_type='float64')
+            for node_id, node in enumerate(predictor.nodes):
+                if node['is_leaf']:
+                    tree[node_id].set_leaf_node(float(node['value']) + bias, leaf_value_type='float64')
+                else:
+                    # Same split as the sklearn predictor: left if x <= threshold, NaN follows missing_go_to_left
+                    tree[node_id].set_numerical_test_node(
+                        int(node['feature_idx']), '<=', float(node['num_threshold']), bool(node['missing_go_to_left']),
+                        int(node['left']), int(node['right']), threshold_type='float64'
+                    )
+            tree[0].set_root()
+            builder.append(tree)
+    return builder.commit()
+
+def load_native_risk_predictor(script_dir, force_compile=False):
+    """Load the treelite-compiled risk model, compiling the shared library when missing or stale"""
+    native_predictors['risk_model'] = None
+    
+    if not TREELITE_AVAILABLE:
+        return False
+    
+    model = ml_models['risk_model']
+    try:
+        toolchain, libext = ('msvc', '.dll') if os.name == 'nt' else ('gcc', '.so')
+        lib_path = os.path.join(script_dir, f'risk_model{libext}')
+        model_path = model_file_path(script_dir, 'risk_model')
+        
+        stale = os.path.exists(lib_path) and os.path.exists(model_path) and os.path.getmtime(lib_path) < os.path.getmtime(model_path)
+        if force_compile or stale or not os.path.exists(lib_path):
+            print(f"Compiling risk_model{libext} with treelite...")
+            if isinstance(model, HistGradientBoostingClassifier) and len(model.classes_) > 2:
+                treelite_model = hist_gradient_boosting_to_treelite(model)
+            else:
+                treelite_model = treelite.sklearn.import_model(model)
+            # Build under a temporary name so a half-written library is never loaded
+            tmp_path = os.path.join(script_dir, f'risk_model.tmp{libext}')
+            treelite_model.export_lib(
+                toolchain=toolchain, libpath=tmp_path,
+                params={'parallel_comp': os.cpu_count() or 1}, verbose=False
+            )
+            os.replace(tmp_path, lib_path)
+            print(f"Compiled risk_model{libext} to {script_dir}")
+        
+        # A newer training run may have replaced the model while compiling
+        if ml_models['risk_model'] is not model:
+            return False
+        
+        native_predictors['risk_model'] = treelite_runtime.Predictor(lib_path, nthread=1, verbose=False)
+        print("Native risk predictor ready")
+        return True
+    except Exception as e:
+        print(f"Warning: native risk predictor unavailable, using ONNX/scikit-learn predict. Error: {e}")
+        native_predictors['risk_model'] = None
+        return False
+
+def predict_risk(features_array):
+    """Predict risk class indices and class probabilities, via treelite or ONNX when available"""
+    # Trees expect float32 C-contiguous input (no copy for the /analyze feature row)
+    features_array = np.ascontiguousarray(features_array, dtype=np.float32)
+    predictor = native_predictors['risk_model']
+    session = onnx_sessions['risk_model']
+    
+    # Small inputs (single /analyze rows) go to the ONNX session; treelite wins on batches
+    if predictor is not None and (session is None or len(features_array) >= SMALL_BATCH_ROWS):
+        probabilities = predictor.predict(treelite_runtime.DMatrix(features_array))
+        return ml_models['risk_model'].classes_.take(probabilities.argmax(axis=1)), probabilities
+    
+    if session is not None:
+        labels, probabilities = session.run(None, {'X': features_array})
+        return labels, probabilities
+    
+    risk_model = ml_models['risk_model']
+    probabilities = risk_model.predict_proba(features_array)
+    return risk_model.classes_.take(probabilities.argmax(axis=1)), probabilities
+
+def predict_category_scores(features_array):
+    """Predict raw category scores, via ONNX when available"""
+    session = onnx_sessions['category_model']
+    if session is not None:
+        return session.run(None, {'X': np.ascontiguousarray(features_array, dtype=np.float32)})[0]
+    
+    category_model = ml_models['category_model']
+    if isinstance(category_model, RandomForestRegressor):
+        # Trees expect float32 C-contiguous input when input checks are skipped
+        features_array = np.ascontiguousarray(features_array, dtype=np.float32)
+        return forest_predict(category_model, features_array).reshape(len(features_array), -1)
+    return category_model.predict(features_array).reshape(len(features_array), -1)
+
+def start_category_prediction(features_array):
+    """Future of predict_category_scores, run on prediction_executor only for the sklearn fallback (ONNX is faster inline)"""
+    if onnx_sessions['category_model'] is not None:
+        future = Future()
+        future.set_result(predict_category_scores(features_array))
+        return future
+    return prediction_executor.submit(predict_category_scores, features_array)
+
+def predict_rows(features_array):
+    """(risk class indices, risk probabilities, raw category scores) for a feature matrix, None for an unloaded model"""
+    # Start the category model first so it overlaps with the risk model
+    category_future = start_category_prediction(features_array) if ml_models['category_model'] is not None else None
+    
+    risk_predictions = risk_probabilities = None
+    if ml_models['risk_model'] is not None:
+        risk_predictions, risk_probabilities = predict_risk(features_array)
+    
+    category_scores = category_future.result() if category_future is not None else None
+    return risk_predictions, risk_probabilities, category_scores
+
+def prediction_batch_worker():
+    """Collect queued (row, future) pairs into batches of up to PREDICT_BATCH_MAX and resolve each future with its row's predictions"""
+    while True:
+        batch = [prediction_queue.get()]
+        deadline = None
+        while len(batch) < PREDICT_BATCH_MAX:
+            try:
+                batch.append(prediction_queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            
+            # Nothing else was waiting: don't delay a lone request
+            if len(batch) == 1:
+                break
+            if deadline is None:
+                deadline = time.perf_counter() + PREDICT_BATCH_WINDOW_MS / 1000
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(prediction_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # Rows can only be stacked with rows of the same length (a mismatched request fails on its own)
+        batches_by_length = {}
+        for row, future in batch:
+            batches_by_length.setdefault(len(row), []).append((row, future))
+        
+        for items in batches_by_length.values():
+            try:
+                risk_predictions, risk_probabilities, category_scores = predict_rows(np.vstack([row for row, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            
+            for index, (_, future) in enumerate(items):
+                future.set_result((
+                    int(risk_predictions[index]) if risk_predictions is not None else None,
+                    risk_probabilities[index] if risk_probabilities is not None else None,
+                    category_scores[index] if category_scores is not None else None
+                ))
+
+def submit_row_prediction(row):
+    """Future of predict_rows' outputs for one feature row, predicted together with other queued rows"""
+    global prediction_batcher
+    with prediction_batcher_lock:
+        if prediction_batcher is None or not prediction_batcher.is_alive():
+            prediction_batcher = threading.Thread(target=prediction_batch_worker, name='prediction-batcher', daemon=True)
+            prediction_batcher.start()
+    
+    future = Future()
+    prediction_queue.put((row, future))
+    return future
+
+@lru_cache(maxsize=1024)
+def predict_row_cached(features_bytes):
+    """(risk class index, risk probabilities, raw category scores) for one float32 feature row, None for an unloaded model
+    Memoized on the row bytes, so repeated/retried /analyze requests skip both models; cleared whenever the models change"""
+    row = np.frombuffer(features_bytes, dtype=np.float32)
+    risk_prediction, risk_probabilities, category_scores = submit_row_prediction(row).result()
+    
+    # Shared by every cache hit
+    for array in (risk_probabilities, category_scores):
+        if array is not None:
+            array.setflags(write=False)
+    return risk_prediction, risk_probabilities, category_scores
 
 def generate_ml_recommendations(couple_profile, risk_level, category_scores):
     """Generate ML-based counseling recommendations using model predictions"""
@@ -1950,12 +2274,13 @@ def generate_ml_recommendations(couple_profile, risk_level, category_scores):
     focus_categories = []
     
     # Extract profile details for context-aware recommendations
-    civil_status = couple_profile.get('civil_status', 'Single')
-    years_together = couple_profile.get('years_living_together', 0)
-    has_children = couple_profile.get('past_children', False)
-    children_count = couple_profile.get('children', 0)
-    male_age = couple_profile.get('male_age', 30)
-    female_age = couple_profile.get('female_age', 30)
+    profile = ChainMap(couple_profile, PROFILE_DEFAULTS)
+    civil_status = profile['civil_status']
+    years_together = profile['years_living_together']
+    has_children = profile['past_children']
+    children_count = profile['children']
+    male_age = profile['male_age']
+    female_age = profile['female_age']
     
     # Process each category based on ML prediction strength
     # Four-level priority system: 0-20%, 20-40%, 40-70%, 70-100%
@@ -1988,7 +2313,7 @@ def generate_ml_recommendations(couple_profile, risk_level, category_scores):
                 
             elif 'responsible' in category_lower and 'parenthood' in category_lower:
                 if has_children:
-                    recommendations.append(f"Address responsible parenting with {children_count} {'child' if children_count == 1 else 'children'} - ML analysis suggests focused attention needed")
+                    recommendations.append(f"Address responsible parenting with {children_count} child{CHILD_SUFFIXES[children_count != 1]} - ML analysis suggests focused attention needed")
                 recommendations.append(f"Strengthen family planning knowledge, shared parental responsibilities, and informed decision-making - ML-identified priority")
                     
             elif 'planning' in category_lower and 'family' in category_lower:
@@ -2029,15 +2354,108 @@ def generate_ml_recommendations(couple_profile, risk_level, category_scores):
     }
 
 
+def build_couple_profile(data):
+    """Extract the couple profile from a request payload with conditional field handling"""
+    couple_profile = {
+        'male_age': data.get('male_age', 30),
+        'female_age': data.get('female_age', 30),
+        'civil_status': data.get('civil_status', 'Single'),
+        'years_living_together': data.get('years_living_together', 0),  # Only for "Living In" status
+        'education_level': data.get('education_level', 2),
+        'income_level': data.get('income_level', 2),
+        'employment_status': data.get('employment_status', 'Unemployed')  # NEW: Employment status
+        # REMOVED: past_children, children
+    }
+    
+    # Handle conditional fields based on civil status
+    if couple_profile['civil_status'] != 'Living In':
+        couple_profile['years_living_together'] = 0
+    
+    return couple_profile
+
+def get_feature_buffer(num_features):
+    """This thread's (1, num_features) float32 C-contiguous row for single-couple predictions"""
+    buffer = getattr(feature_buffers, 'row', None)
+    if buffer is None or buffer.shape[1] != num_features:
+        buffer = np.empty((1, num_features), dtype=np.float32, order='C')
+        feature_buffers.row = buffer
+    return buffer
+
+def build_feature_vector(couple_profile, male_responses, female_responses, personalized_features, row):
+    """Fill row (1-D float32, 11 + responses + 6 long) with the model features for one couple"""
+    # FEATURE BREAKDOWN (Total: 135 features):
+    #   1. Demographic features: 11
+    #      - male_age, female_age, age_gap, years_living_together
+    #      - education_level, income_level, education_income_diff
+    #      - is_single, is_living_in, is_separated_divorced, employment_encoded
+    #   2. Questionnaire responses: 118 (59 male + 59 female)
+    #      - male_responses: 59 features (from respondent='male' in couple_responses)
+    #      - female_responses: 59 features (from respondent='female' in couple_responses)
+    #   3. Personalized features: 6
+    #      - alignment_score, conflict_ratio
+    #      - category_alignments: 4 features (one per MEAI category)
+    
+    # NEW: Calculate age gap
+    age_gap = abs(couple_profile['male_age'] - couple_profile['female_age'])
+    
+    # NEW: Calculate education/income compatibility
+    education_income_diff = abs(couple_profile['education_level'] - couple_profile['income_level'])
+    
+    # NEW: Civil status encoding (one-hot: 3 features)
+    civil_status = couple_profile.get('civil_status', 'Single')
+    is_single = 1 if civil_status == 'Single' else 0
+    is_living_in = 1 if civil_status == 'Living In' else 0
+    is_separated_divorced = 1 if civil_status in ['Separated', 'Divorced', 'Widowed'] else 0
+    
+    # NEW: Encode employment status (use male partner's employment status)
+    # Employed=1, Self-employed=2, Unemployed=0
+    employment_status = couple_profile.get('employment_status', 'Unemployed')
+    if employment_status == 'Employed':
+        employment_encoded = 1
+    elif employment_status == 'Self-employed':
+        employment_encoded = 2
+    else:  # Unemployed or unknown
+        employment_encoded = 0
+    
+    # Basic demographic features (11 features)
+    row[:11] = (
+        couple_profile['male_age'],
+        couple_profile['female_age'],
+        age_gap,
+        couple_profile['years_living_together'],  # 0 for non-Living In couples
+        couple_profile['education_level'],
+        couple_profile['income_level'],
+        education_income_diff,
+        is_single,
+        is_living_in,
+        is_separated_divorced,
+        employment_encoded  # NEW: Employment status
+        # REMOVED: children feature
+    )
+    
+    # CRITICAL: Always use separate male_responses + female_responses (118 features total)
+    # This is REQUIRED - no fallback to questionnaire_responses
+    female_start = 11 + len(male_responses)
+    row[11:female_start] = male_responses
+    row[female_start:female_start + len(female_responses)] = female_responses
+    
+    # Add personalized features (6 features: alignment_score, conflict_ratio, 4 category_alignments)
+    row[female_start + len(female_responses):] = (
+        personalized_features.get('alignment_score', 0.5),
+        personalized_features.get('conflict_ratio', 0.0),
+        # Category-specific alignments (4 features, one per MEAI category)
+        *personalized_features.get('category_alignments', [0.5, 0.5, 0.5, 0.5])
+    )
+    
+    return row
+
 @app.route('/status', methods=['GET'])
 def status():
     """Check service status"""
-    ml_trained = all(model is not None for model in ml_models.values())
-    
-    return jsonify({
+    return ojsonify({
         'status': 'success',
         'service': 'Counseling Topics Service',
-        'ml_trained': ml_trained
+        'ml_trained': MODELS_READY
     })
 
 def train_models_async():
@@ -2093,7 +2511,7 @@ def train():
         if training_status['in_progress']:
             thread = training_status.get('thread')
             if thread and thread.is_alive():
-                return jsonify({
+                return ojsonify({
                     'status': 'error',
                     'message': 'Training is already in progress. Please wait for it to complete.'
                 }), 400
@@ -2117,7 +2535,7 @@ def train():
         training_status['thread'] = thread
         thread.start()
         
-        return jsonify({
+        return ojsonify({
             'status': 'success',
             'message': 'Training started in background',
             'training_started': True
@@ -2127,7 +2545,7 @@ def train():
 def get_training_status():
     """Get current training status"""
     with training_lock:
-        return jsonify({
+        return ojsonify({
             'status': 'success',
             'in_progress': training_status['in_progress'],
             'progress': training_status['progress'],
@@ -2152,20 +2570,7 @@ def analyze():
                 print(f"DEBUG - Raw female_responses value type: {type(data['female_responses'])}, length: {len(data['female_responses']) if isinstance(data['female_responses'], (list, tuple)) else 'N/A'}")
         
         # Extract couple profile with conditional field handling
-        couple_profile = {
-            'male_age': data.get('male_age', 30),
-            'female_age': data.get('female_age', 30),
-            'civil_status': data.get('civil_status', 'Single'),
-            'years_living_together': data.get('years_living_together', 0),  # Only for "Living In" status
-            'education_level': data.get('education_level', 2),
-            'income_level': data.get('income_level', 2),
-            'employment_status': data.get('employment_status', 'Unemployed')  # NEW: Employment status
-            # REMOVED: past_children, children
-        }
-        
-        # Handle conditional fields based on civil status
-        if couple_profile['civil_status'] != 'Living In':
-            couple_profile['years_living_together'] = 0
+        couple_profile = build_couple_profile(data)
         
         # Extract questionnaire responses (dynamic count based on actual questions)
         total_questions = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 31  # Fallback to 31
@@ -2190,27 +2595,27 @@ def analyze():
         # These MUST come from the couple_responses table with respondent='male' or 'female'
         if not male_responses or len(male_responses) == 0:
             print(f"ERROR - male_responses is empty or None. Type: {type(male_responses)}, Value: {male_responses}")
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': 'male_responses is required and must not be empty. Data must come from couple_responses table with respondent="male".'
             }), 400
             
         if not female_responses or len(female_responses) == 0:
             print(f"ERROR - female_responses is empty or None. Type: {type(female_responses)}, Value: {female_responses}")
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': 'female_responses is required and must not be empty. Data must come from couple_responses table with respondent="female".'
             }), 400
         
         # Validate that arrays are lists/tuples
         if not isinstance(male_responses, (list, tuple)):
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': f'male_responses must be a list/array, got {type(male_responses)}'
             }), 400
             
         if not isinstance(female_responses, (list, tuple)):
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': f'female_responses must be a list/array, got {type(female_responses)}'
             }), 400
@@ -2219,25 +2624,34 @@ def analyze():
         expected_count = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 59
         if len(male_responses) != expected_count:
             print(f"ERROR - male_responses length ({len(male_responses)}) does not match expected ({expected_count})")
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': f'male_responses must have {expected_count} items (one per answerable question), got {len(male_responses)}'
             }), 400
             
         if len(female_responses) != expected_count:
             print(f"ERROR - female_responses length ({len(female_responses)}) does not match expected ({expected_count})")
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': f'female_responses must have {expected_count} items (one per answerable question), got {len(female_responses)}'
             }), 400
         
         # Validate that arrays match each other in length
         if len(male_responses) != len(female_responses):
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': f'male_responses ({len(male_responses)} items) and female_responses ({len(female_responses)} items) must have the same length'
             }), 400
         
+        # Response codes index CONFLICT_LUT, so out-of-range codes are rejected instead of clipped
+        for field, responses in (('male_responses', male_responses), ('female_responses', female_responses)):
+            invalid_index = first_invalid_response_index(responses)
+            if invalid_index is not None:
+                return ojsonify({
+                    'status': 'error',
+                    'message': f'{field}[{invalid_index}] must be a response code {RESPONSE_CODE_MIN}-{RESPONSE_CODE_MAX}, got {responses[invalid_index]!r}'
+                }), 400
+        
         # CRITICAL: Verify arrays are not all zeros or all the same value (data quality check)
         if all(r == 0 for r in male_responses) or all(r == male_responses[0] for r in male_responses if len(male_responses) > 0):
             print(f"WARNING - male_responses appears to have low variance (all values are {male_responses[0] if len(male_responses) > 0 else 'N/A'})")
@@ -2248,13 +2662,7 @@ def analyze():
         
         # Calculate actual expected count for debugging
         if MEAI_QUESTIONS:
-            actual_expected = 0
-            for cat_questions in MEAI_QUESTIONS.values():
-                for q_data in cat_questions.values():
-                    if q_data.get('sub_questions'):
-                        actual_expected += len(q_data['sub_questions'])
-                    else:
-                        actual_expected += 1
+            actual_expected = len(QUESTION_CAT_IDS)
             print(f"DEBUG - MEAI_QUESTIONS loaded: {len(MEAI_QUESTIONS)} categories, {actual_expected} answerable questions")
         else:
             print(f"DEBUG - MEAI_QUESTIONS not loaded!")
@@ -2273,7 +2681,7 @@ def analyze():
         )
         
         if not validation_result['valid']:
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': 'Data validation failed: ' + '; '.join(validation_result['errors'])
             })
@@ -2283,130 +2691,47 @@ def analyze():
             for warning in validation_result['warnings']:
                 print(f"  - {warning}")
         
-        # NEW: Calculate age gap
-        age_gap = abs(couple_profile['male_age'] - couple_profile['female_age'])
-        
-        # NEW: Calculate education/income compatibility
-        education_income_diff = abs(couple_profile['education_level'] - couple_profile['income_level'])
-        
-        # NEW: Civil status encoding (one-hot: 3 features)
-        civil_status = couple_profile.get('civil_status', 'Single')
-        is_single = 1 if civil_status == 'Single' else 0
-        is_living_in = 1 if civil_status == 'Living In' else 0
-        is_separated_divorced = 1 if civil_status in ['Separated', 'Divorced', 'Widowed'] else 0
-        
-        # NEW: Encode employment status (use male partner's employment status)
-        # Employed=1, Self-employed=2, Unemployed=0
-        employment_status = couple_profile.get('employment_status', 'Unemployed')
-        if employment_status == 'Employed':
-            employment_encoded = 1
-        elif employment_status == 'Self-employed':
-            employment_encoded = 2
-        else:  # Unemployed or unknown
-            employment_encoded = 0
-        
-        # Prepare features for ML models
-        # FEATURE BREAKDOWN (Total: 135 features):
-        #   1. Demographic features: 11
-        #      - male_age, female_age, age_gap, years_living_together
-        #      - education_level, income_level, education_income_diff
-        #      - is_single, is_living_in, is_separated_divorced, employment_encoded
-        #   2. Questionnaire responses: 118 (59 male + 59 female)
-        #      - male_responses: 59 features (from respondent='male' in couple_responses)
-        #      - female_responses: 59 features (from respondent='female' in couple_responses)
-        #   3. Personalized features: 6
-        #      - alignment_score, conflict_ratio
-        #      - category_alignments: 4 features (one per MEAI category)
-        
-        # Basic demographic features (11 features)
-        features = [
-            couple_profile['male_age'],
-            couple_profile['female_age'],
-            age_gap,
-            couple_profile['years_living_together'],  # 0 for non-Living In couples
-            couple_profile['education_level'],
-            couple_profile['income_level'],
-            education_income_diff,
-            is_single,
-            is_living_in,
-            is_separated_divorced,
-            employment_encoded  # NEW: Employment status
-            # REMOVED: children feature
-        ]
-        
-        print(f"DEBUG - Step 1: Added {len(features)} demographic features")
+        # Prepare features for ML models (11 demographic + 59 male + 59 female + 6 personalized)
+        # straight into this thread's reusable float32 row instead of allocating a new array per request
+        expected_features = 11 + len(male_responses) + len(female_responses) + 6  # 11 demographic + 118 responses + 6 personalized
+        features_array = get_feature_buffer(expected_features)
+        build_feature_vector(couple_profile, male_responses, female_responses, personalized_features, features_array[0])
         
-        # CRITICAL: Use separate male_responses + female_responses (118 features total)
-        # This gives us 59 + 59 = 118 features instead of 59 combined
-        # REQUIRED: male_responses and female_responses must come from respondent field
-        # We already validated they exist above, so we can safely use them here
-        print(f"DEBUG - Step 2: Using male_responses ({len(male_responses)} items) and female_responses ({len(female_responses)} items) from respondent field")
+        print(f"DEBUG - Using male_responses ({len(male_responses)} items) and female_responses ({len(female_responses)} items) from respondent field")
         print(f"DEBUG -   male_responses first 3: {male_responses[:3] if len(male_responses) >= 3 else male_responses}")
         print(f"DEBUG -   female_responses first 3: {female_responses[:3] if len(female_responses) >= 3 else female_responses}")
         
-        # CRITICAL: Always use separate male_responses + female_responses (118 features total)
-        # This is REQUIRED - no fallback to questionnaire_responses
-        features.extend(male_responses)
-        features.extend(female_responses)
-        
-        print(f"DEBUG - Step 2: After adding responses, total features = {len(features)} (11 demographic + {len(male_responses)} male + {len(female_responses)} female)")
-        
-        # Add personalized features (6 features: alignment_score, conflict_ratio, 4 category_alignments)
-        personalized_feature_values = [
-            personalized_features.get('alignment_score', 0.5),
-            personalized_features.get('conflict_ratio', 0.0),
-            # Category-specific alignments (4 features, one per MEAI category)
-            *personalized_features.get('category_alignments', [0.5, 0.5, 0.5, 0.5])
-            # REMOVED: male_avg_response, female_avg_response, male_agree_ratio, male_disagree_ratio, female_agree_ratio, female_disagree_ratio
-        ]
-        
-        features.extend(personalized_feature_values)
-        
-        # CRITICAL: Verify feature count
-        expected_features = 11 + len(male_responses) + len(female_responses) + 6  # 11 demographic + 118 responses + 6 personalized
-        actual_features = len(features)
+        # CRITICAL: Verify feature count against what the trained model expects
+        model_features = ml_models['risk_model'].n_features_in_ if ml_models['risk_model'] is not None else expected_features
         
         print(f"DEBUG - Feature count breakdown:")
         print(f"DEBUG -   Demographic features: 11")
         print(f"DEBUG -   Male responses: {len(male_responses)}")
         print(f"DEBUG -   Female responses: {len(female_responses)}")
         print(f"DEBUG -   Personalized features: 6")
-        print(f"DEBUG -   Expected total: {expected_features}")
-        print(f"DEBUG -   Actual total: {actual_features}")
+        print(f"DEBUG -   Expected total: {model_features}")
+        print(f"DEBUG -   Actual total: {expected_features}")
         
-        if actual_features != expected_features:
-            print(f"ERROR - Feature count mismatch! Expected {expected_features}, got {actual_features}")
+        if model_features != expected_features:
+            print(f"ERROR - Feature count mismatch! Expected {model_features}, got {expected_features}")
             print(f"ERROR - This suggests male_responses or female_responses are not being used correctly")
         
-        features_array = np.array(features).reshape(1, -1)
-        print(f"Analysis with {len(features)} features: {features_array.shape}")
+        print(f"Analysis with {expected_features} features: {features_array.shape}")
+        
+        # Model outputs for this exact feature row (memoized, see predict_row_cached)
+        risk_prediction, risk_probs, raw_category_scores = predict_row_cached(features_array.tobytes())
         
         # HYBRID APPROACH: Calculate actual risk level from disagreement ratio AND use ML prediction
         # This helps catch cases where the model might be biased
         # Calculate actual disagreement ratio from male/female responses (more accurate)
         # Count disagreements: when partners disagree with the question OR when partners disagree with each other
         total_questions = min(len(male_responses), len(female_responses))
-        partner_disagree_count = 0  # When partners disagree with each other
-        question_disagree_count = 0  # When either partner disagrees with the question (response = 2)
-        neutral_count = 0
-        
-        for i in range(total_questions):
-            male_resp = male_responses[i] if i < len(male_responses) else 3
-            female_resp = female_responses[i] if i < len(female_responses) else 3
-            
-            # Count when either partner disagrees with the question
-            if male_resp == 2 or female_resp == 2:
-                question_disagree_count += 1
-            
-            # Count when partners disagree with each other (significant difference)
-            if abs(male_resp - female_resp) >= 2:  # Significant disagreement between partners
-                partner_disagree_count += 1
-            elif abs(male_resp - female_resp) == 1:  # Minor disagreement
-                partner_disagree_count += 0.5
-            
-            # Count neutrals (either partner is neutral)
-            if male_resp == 3 or female_resp == 3:
-                neutral_count += 1
+        # question_disagree_count: either partner disagrees with the question (response = 2)
+        # partner_disagree_count: partners disagree with each other; neutral_count: either partner is neutral
+        question_disagree_count, partner_disagree_count, neutral_count = disagreement_counts_kernel(
+            np.ascontiguousarray(male_responses[:total_questions], dtype=np.int8),
+            np.ascontiguousarray(female_responses[:total_questions], dtype=np.int8)
+        )
         
         # Combined disagreement: question disagreements + partner disagreements + weighted neutrals
         # Use the maximum of question disagreement or partner disagreement to avoid double counting
@@ -2423,20 +2748,18 @@ def analyze():
             actual_risk_level = 'Low'
         
         print(f"DEBUG - Actual Risk Calculation:")
-        print(f"  Question disagreements: {question_disagree_count}, Partner disagreements: {partner_disagree_count:.1f}, Neutrals: {neutral_count}")
+        print(f"  Question disagreements: {question_disagree_count:.0f}, Partner disagreements: {partner_disagree_count:.1f}, Neutrals: {neutral_count:.0f}")
         print(f"  Total weighted disagree count: {total_disagree_count:.2f}")
         print(f"  Weighted disagree ratio: {actual_disagree_ratio:.3f} ({actual_disagree_ratio*100:.1f}%)")
         print(f"  Actual risk level: {actual_risk_level}")
         
         # Predict risk level using ML model
-        if ml_models['risk_model'] is not None:
-            risk_prediction = ml_models['risk_model'].predict(features_array)[0]
+        if risk_prediction is not None:
             risk_levels = ['Low', 'Medium', 'High']
             ml_risk_level = risk_levels[risk_prediction]
             print(f"DEBUG - ML risk prediction: {ml_risk_level} (index: {risk_prediction})")
             
             # ML confidence based solely on model probabilities
-            risk_probs = ml_models['risk_model'].predict_proba(features_array)[0]
             ml_confidence = float(np.clip(np.max(risk_probs), 0.0, 1.0))
             print(f"DEBUG - ML probabilities: Low={risk_probs[0]:.3f}, Medium={risk_probs[1]:.3f}, High={risk_probs[2]:.3f}")
             
@@ -2472,17 +2795,19 @@ def analyze():
                 print(f"DEBUG - Using ACTUAL risk level ({actual_risk_level}) over ML prediction ({ml_risk_level})")
                 print(f"DEBUG - Reason: Actual calculation is more reliable for this risk level")
         else:
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': 'Risk model not loaded. Train or load models first.'
             })
         
         # Predict category scores with personalized adjustments
-        if ml_models['category_model'] is not None:
-            category_scores = ml_models['category_model'].predict(features_array)[0]
-            category_scores = np.clip(category_scores, 0.0, 1.0)
+        if raw_category_scores is not None:
+            # float64 scores behave like Python floats downstream and serialize as-is (no tolist/float copies)
+            category_scores = np.clip(raw_category_scores, 0.0, 1.0, dtype=np.float64)
+            # Priority order (highest score first, ties keep category order), computed once for the response
+            order = np.argsort(-category_scores[:len(MEAI_CATEGORIES)], kind='stable')
         else:
-            return jsonify({
+            return ojsonify({
                 'status': 'error',
                 'message': 'Category model not loaded. Train or load models first.'
             })
@@ -2509,7 +2834,7 @@ def analyze():
             
             focus_categories.append({
                 'name': cat,
-                'score': float(score),
+                'score': score,
                 'priority': priority_level
             })
         
@@ -2542,33 +2867,134 @@ def analyze():
             personalized_features, male_responses, female_responses, couple_profile
         )
         
-        return jsonify({
+        return ojsonify({
             'status': 'success',
             'couple_id': data.get('couple_id', 'unknown'),
             'risk_level': risk_level,  # Final hybrid risk level
             'actual_risk_level': actual_risk_level,  # Response-based risk level (male vs female comparison)
             'actual_disagree_ratio': float(actual_disagree_ratio),  # Disagreement ratio percentage
             'ml_risk_level': ml_risk_level,  # ML model prediction
-            'category_scores': category_scores.tolist(),
-            'focus_categories': sorted(focus_categories, key=lambda x: x['score'], reverse=True),
+            'category_scores': category_scores,
+            'focus_categories': [focus_categories[i] for i in order],
             'recommendations': personalized_recommendations,
             'ml_confidence': ml_confidence,  # Dynamic confidence based on risk level
             'risk_reasoning': risk_reasoning,
             'counseling_reasoning': counseling_reasoning,
             'analysis_method': 'Random Forest Counseling Topics with Personalized Features',
-            'generated_at': pd.Timestamp.now().isoformat()
+            'generated_at': datetime.now(timezone.utc).isoformat()
         })
         
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'status': 'error',
             'message': f'Analysis error: {str(e)}'
         })
 
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Predict risk levels and category scores for several couples in one model call"""
+    try:
+        data = request.get_json()
+        couples = data.get('couples', []) if data else []
+        
+        if not isinstance(couples, list) or len(couples) == 0:
+            return ojsonify({
+                'status': 'error',
+                'message': 'couples is required and must be a non-empty list'
+            }), 400
+        
+        if len(couples) > MAX_BATCH_COUPLES:
+            return ojsonify({
+                'status': 'error',
+                'message': f'At most {MAX_BATCH_COUPLES} couples can be scored per request, got {len(couples)}'
+            }), 400
+        
+        if ml_models['risk_model'] is None or ml_models['category_model'] is None:
+            return ojsonify({
+                'status': 'error',
+                'message': 'Models not loaded. Train or load models first.'
+            })
+        
+        expected_count = len(MEAI_QUESTION_MAPPING) if MEAI_QUESTION_MAPPING else 59
+        features_array = np.empty((len(couples), 11 + 2 * expected_count + 6), dtype=np.float32)
+        alignment_scores = np.empty(len(couples), dtype=np.float64)
+        conflict_ratios = np.empty(len(couples), dtype=np.float64)
+        
+        for index, couple in enumerate(couples):
+            male_responses = couple.get('male_responses', [])
+            female_responses = couple.get('female_responses', [])
+            
+            # Same response requirements as /analyze, reported per couple index
+            if not isinstance(male_responses, (list, tuple)) or len(male_responses) != expected_count:
+                return ojsonify({
+                    'status': 'error',
+                    'message': f'couples[{index}]: male_responses must have {expected_count} items (one per answerable question)'
+                }), 400
+            
+            if not isinstance(female_responses, (list, tuple)) or len(female_responses) != expected_count:
+                return ojsonify({
+                    'status': 'error',
+                    'message': f'couples[{index}]: female_responses must have {expected_count} items (one per answerable question)'
+                }), 400
+            
+            for field, responses in (('male_responses', male_responses), ('female_responses', female_responses)):
+                invalid_index = first_invalid_response_index(responses)
+                if invalid_index is not None:
+                    return ojsonify({
+                        'status': 'error',
+                        'message': f'couples[{index}]: {field}[{invalid_index}] must be a response code {RESPONSE_CODE_MIN}-{RESPONSE_CODE_MAX}, got {responses[invalid_index]!r}'
+                    }), 400
+            
+            personalized_features = couple.get('personalized_features', {})
+            if not personalized_features:
+                personalized_features = calculate_personalized_features_flask(
+                    couple.get('questionnaire_responses', []), male_responses, female_responses
+                )
+            
+            build_feature_vector(build_couple_profile(couple), male_responses, female_responses, personalized_features, features_array[index])
+            alignment_scores[index] = personalized_features.get('alignment_score', 0.5)
+            conflict_ratios[index] = personalized_features.get('conflict_ratio', 0.0)
+        
+        # One predict call per model for the whole batch
+        category_future = start_category_prediction(features_array)
+        risk_predictions, risk_probs = predict_risk(features_array)
+        category_scores = np.clip(category_future.result(), 0.0, 1.0, dtype=np.float64)
+        
+        # Response-pattern recommendations for the whole batch (responses are already in the feature rows)
+        recommendations = batch_score_recommendations(
+            alignment_scores, conflict_ratios,
+            features_array[:, 11:11 + expected_count], features_array[:, 11 + expected_count:11 + 2 * expected_count]
+        )
+        
+        risk_levels = ['Low', 'Medium', 'High']
+        results = []
+        for index, couple in enumerate(couples):
+            results.append({
+                'couple_id': couple.get('couple_id', 'unknown'),
+                'ml_risk_level': risk_levels[risk_predictions[index]],
+                'ml_confidence': float(np.clip(np.max(risk_probs[index]), 0.0, 1.0)),
+                'category_scores': category_scores[index],
+                'recommendations': recommendations[index]
+            })
+        
+        print(f"Batch prediction for {len(results)} couples with {features_array.shape[1]} features")
+        
+        return ojsonify({
+            'status': 'success',
+            'count': len(results),
+            'predictions': results
+        })
+        
+    except Exception as e:
+        return ojsonify({
+            'status': 'error',
+            'message': f'Batch prediction error: {str(e)}'
+        })
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         'status': 'healthy',
         'service': 'Counseling Topics Service',
         'version': '1.0.0'
@@ -2604,21 +3030,81 @@ def generate_personalized_recommendations(risk_level, category_scores, focus_cat
         # Fallback to original rule-based system
         return generate_rule_based_recommendations(risk_level, category_scores, focus_categories, personalized_features, male_responses, female_responses)
 
+# NEW: Rule-based recommendation %-format templates, materialized once per call
+RECOMMENDATION_TEMPLATES = {
+    'alignment_critical': "🚨 CRITICAL ALIGNMENT: Only %d%% agreement detected - immediate relationship counseling required",
+    'alignment_significant': "⚠️ SIGNIFICANT DISAGREEMENT: %d%% disagreement on key issues - structured communication therapy needed",
+    'alignment_moderate': "🔄 MODERATE ALIGNMENT: %d%% agreement - focus on understanding different perspectives",
+    'alignment_strong': "✅ STRONG ALIGNMENT: %d%% agreement - continue building on shared values and goals",
+    'optimism_excellent': "🌟 EXCELLENT HARMONY: %d%% positive responses - maintain current healthy communication patterns",
+    'optimism_good': "😊 GOOD HARMONY: %d%% positive responses - good foundation with room for growth",
+    'optimism_moderate': "😐 MODERATE HARMONY: %d%% positive responses - focus on building shared positive perspectives",
+    'optimism_concerning': "😟 CONCERNING HARMONY: Only %d%% positive responses - intensive counseling needed to address underlying concerns",
+    'conflict_high': "💥 HIGH CONFLICT: %d%% of responses show major disagreement - intensive conflict resolution counseling required",
+    'conflict_moderate': "⚡ MODERATE CONFLICT: %d%% disagreement detected - mediation and communication skills training recommended",
+    'conflict_minor': "🤝 MINOR CONFLICTS: %d%% disagreement - focus on conflict prevention strategies",
+    'conflict_excellent': "🎯 EXCELLENT HARMONY: Only %d%% disagreement - maintain current healthy communication patterns",
+    'partner_male_higher': "👨 PARTNER DIFFERENCES: Male partner shows %.1f vs female %.1f average - ensure balanced decision-making and equal voice",
+    'partner_female_higher': "👩 PARTNER DIFFERENCES: Female partner shows %.1f vs male %.1f average - ensure balanced decision-making and equal voice",
+    'partner_balanced': "🤝 BALANCED PARTNERSHIP: Similar response averages (%.1f vs %.1f) - excellent relationship equality",
+    ('male', 'positive'): "👨 MALE POSITIVE: Male partner shows %d%% positive responses - excellent engagement and optimism",
+    ('male', 'concerns'): "👨 MALE CONCERNS: Male partner shows only %d%% positive responses - individual counseling recommended",
+    ('female', 'positive'): "👩 FEMALE POSITIVE: Female partner shows %d%% positive responses - excellent engagement and optimism",
+    ('female', 'concerns'): "👩 FEMALE CONCERNS: Female partner shows only %d%% positive responses - individual counseling recommended",
+    'risk_high': "🔴 HIGH RISK PROFILE: Intensive counseling required - focus on core relationship issues, communication, and conflict resolution",
+    'risk_crisis': "💥 CRISIS INTERVENTION: %d%% conflict rate - immediate mediation or specialized counseling required",
+    'risk_medium': "🟡 MEDIUM RISK PROFILE: Proactive counseling recommended - address identified issues before they escalate into major problems",
+    'risk_low': "🟢 LOW RISK PROFILE: Preventive counseling - maintain healthy relationship patterns and continue building strong foundations",
+}
+
+# NEW: Tiered template keys, indexed by bisect over ascending thresholds
+# (bisect_right for the strict '<' alignment ladder, bisect_left for the strict '>' ladders)
+ALIGNMENT_THRESHOLDS = (0.3, 0.5, 0.7)
+ALIGNMENT_TEMPLATE_KEYS = ('alignment_critical', 'alignment_significant', 'alignment_moderate', 'alignment_strong')
+OPTIMISM_THRESHOLDS = (0.3, 0.5, 0.7)
+OPTIMISM_TEMPLATE_KEYS = ('optimism_concerning', 'optimism_moderate', 'optimism_good', 'optimism_excellent')
+CONFLICT_THRESHOLDS = (0.1, 0.3, 0.5)
+CONFLICT_TEMPLATE_KEYS = ('conflict_excellent', 'conflict_minor', 'conflict_moderate', 'conflict_high')
+
+# NEW: Category focus templates keyed by (kind, tier); tiers are score > 0.3 / 0.5 / 0.7
+CATEGORY_FOCUS_KINDS = ('Marriage', 'Family', 'Health')
+CATEGORY_FOCUS_THRESHOLDS = (0.3, 0.5, 0.7)
+CATEGORY_FOCUS_TIERS = (None, 'moderate', 'high', 'critical')
+CATEGORY_FOCUS_TEMPLATES = {
+    ('Marriage', 'critical'): "💕 CRITICAL MARRIAGE FOCUS: %s at %d%% - immediate relationship foundation counseling required",
+    ('Family', 'critical'): "👶 CRITICAL FAMILY PLANNING: %s at %d%% - intensive family planning and parenting preparation needed",
+    ('Health', 'critical'): "🏥 CRITICAL HEALTH FOCUS: %s at %d%% - immediate health and wellness counseling required",
+    ('Marriage', 'high'): "💕 HIGH MARRIAGE PRIORITY: %s at %d%% - relationship foundation counseling recommended",
+    ('Family', 'high'): "👶 HIGH FAMILY PRIORITY: %s at %d%% - family planning counseling recommended",
+    ('Health', 'high'): "🏥 HIGH HEALTH PRIORITY: %s at %d%% - health and wellness counseling recommended",
+    ('Marriage', 'moderate'): "💕 MODERATE MARRIAGE FOCUS: %s at %d%% - relationship development sessions",
+    ('Family', 'moderate'): "👶 MODERATE FAMILY FOCUS: %s at %d%% - family planning education",
+    ('Health', 'moderate'): "🏥 MODERATE HEALTH FOCUS: %s at %d%% - health awareness sessions",
+}
+RECOMMENDATION_TEMPLATES.update(CATEGORY_FOCUS_TEMPLATES)
+
+@dataclass(frozen=True, slots=True)
+class RecommendationSet:
+    """Rule-based recommendations as (RECOMMENDATION_TEMPLATES key, args) pairs, formatted to text on demand"""
+    ops: tuple
+    
+    def to_strings(self):
+        """Recommendation text, one string per op"""
+        return [RECOMMENDATION_TEMPLATES[key] % args for key, args in self.ops]
+
 def generate_rule_based_recommendations(risk_level, category_scores, focus_categories, personalized_features, male_responses, female_responses):
     """Fallback rule-based recommendation generation"""
-    recommendations = []
-    
     # Extract personalized features
     alignment_score = personalized_features.get('alignment_score', 0.5)
     conflict_ratio = personalized_features.get('conflict_ratio', 0.0)
     male_avg = personalized_features.get('male_avg_response', 3.0)
     female_avg = personalized_features.get('female_avg_response', 3.0)
     
-    # ENHANCED PERSONALIZATION: Analyze actual response patterns
-    male_agree_count = sum(1 for r in male_responses if r >= 4)
-    female_agree_count = sum(1 for r in female_responses if r >= 4)
-    male_disagree_count = sum(1 for r in male_responses if r <= 2)
-    female_disagree_count = sum(1 for r in female_responses if r <= 2)
+    # ENHANCED PERSONALIZATION: Analyze actual response patterns (one vectorized compare per count)
+    male = np.asarray(male_responses)
+    female = np.asarray(female_responses)
+    male_agree_count = int(np.count_nonzero(male >= 4))
+    female_agree_count = int(np.count_nonzero(female >= 4))
     
     # Calculate unique couple dynamics
     total_responses = len(male_responses)
@@ -2626,119 +3112,156 @@ def generate_rule_based_recommendations(risk_level, category_scores, focus_categ
     female_positive_ratio = female_agree_count / total_responses if total_responses > 0 else 0
     couple_optimism = (male_positive_ratio + female_positive_ratio) / 2
     
-    # 1. ENHANCED PERSONALIZED ALIGNMENT RECOMMENDATIONS
-    if alignment_score < 0.3:
-        recommendations.append(f"🚨 CRITICAL ALIGNMENT: Only {int(alignment_score * 100)}% agreement detected - immediate relationship counseling required")
-    elif alignment_score < 0.5:
-        recommendations.append(f"⚠️ SIGNIFICANT DISAGREEMENT: {int((1-alignment_score) * 100)}% disagreement on key issues - structured communication therapy needed")
-    elif alignment_score < 0.7:
-        recommendations.append(f"🔄 MODERATE ALIGNMENT: {int(alignment_score * 100)}% agreement - focus on understanding different perspectives")
-    else:
-        recommendations.append(f"✅ STRONG ALIGNMENT: {int(alignment_score * 100)}% agreement - continue building on shared values and goals")
-    
-    # 1.5. COUPLE-SPECIFIC OPTIMISM ANALYSIS
-    if couple_optimism > 0.7:
-        recommendations.append(f"🌟 EXCELLENT HARMONY: {int(couple_optimism * 100)}% positive responses - maintain current healthy communication patterns")
-    elif couple_optimism > 0.5:
-        recommendations.append(f"😊 GOOD HARMONY: {int(couple_optimism * 100)}% positive responses - good foundation with room for growth")
-    elif couple_optimism > 0.3:
-        recommendations.append(f"😐 MODERATE HARMONY: {int(couple_optimism * 100)}% positive responses - focus on building shared positive perspectives")
-    else:
-        recommendations.append(f"😟 CONCERNING HARMONY: Only {int(couple_optimism * 100)}% positive responses - intensive counseling needed to address underlying concerns")
+    # The cache is keyed on the discrete values the recommendations depend on: each ladder's tier
+    # index plus the percentage it displays, so nearby scores share one entry
+    # Alignment: score < 0.3 / 0.5 / 0.7; the significant-disagreement tier reports the disagreement share
+    alignment_tier = bisect_right(ALIGNMENT_THRESHOLDS, alignment_score)
+    alignment_pct = int((1-alignment_score) * 100) if alignment_tier == 1 else int(alignment_score * 100)
+    # Optimism: optimism > 0.3 / 0.5 / 0.7; conflict: conflict > 0.1 / 0.3 / 0.5
+    optimism_key = (bisect_left(OPTIMISM_THRESHOLDS, couple_optimism), int(couple_optimism * 100))
+    conflict_key = (bisect_left(CONFLICT_THRESHOLDS, conflict_ratio), int(conflict_ratio * 100))
     
-    # 2. DYNAMIC CONFLICT-SPECIFIC RECOMMENDATIONS
-    if conflict_ratio > 0.5:
-        recommendations.append(f"💥 HIGH CONFLICT: {int(conflict_ratio * 100)}% of responses show major disagreement - intensive conflict resolution counseling required")
-    elif conflict_ratio > 0.3:
-        recommendations.append(f"⚡ MODERATE CONFLICT: {int(conflict_ratio * 100)}% disagreement detected - mediation and communication skills training recommended")
-    elif conflict_ratio > 0.1:
-        recommendations.append(f"🤝 MINOR CONFLICTS: {int(conflict_ratio * 100)}% disagreement - focus on conflict prevention strategies")
-    else:
-        recommendations.append(f"🎯 EXCELLENT HARMONY: Only {int(conflict_ratio * 100)}% disagreement - maintain current healthy communication patterns")
-    
-    # 3. PARTNER-SPECIFIC ANALYSIS (based on average responses)
-    # Check for significant differences in partner responses
+    # Partner differences: the template plus the averages at the one decimal place it shows
     avg_difference = abs(male_avg - female_avg)
     if avg_difference > 0.5 and alignment_score < 0.8:
         if male_avg > female_avg:
-            recommendations.append(f"👨 PARTNER DIFFERENCES: Male partner shows {male_avg:.1f} vs female {female_avg:.1f} average - ensure balanced decision-making and equal voice")
+            partner_op = ('partner_male_higher', (round(male_avg, 1), round(female_avg, 1)))
         else:
-            recommendations.append(f"👩 PARTNER DIFFERENCES: Female partner shows {female_avg:.1f} vs male {male_avg:.1f} average - ensure balanced decision-making and equal voice")
+            partner_op = ('partner_female_higher', (round(female_avg, 1), round(male_avg, 1)))
     elif avg_difference <= 0.3:
-        recommendations.append(f"🤝 BALANCED PARTNERSHIP: Similar response averages ({male_avg:.1f} vs {female_avg:.1f}) - excellent relationship equality")
+        partner_op = ('partner_balanced', (round(male_avg, 1), round(female_avg, 1)))
+    else:
+        partner_op = None
+    
+    # Per-partner response pattern: positive (> 0.7), concerns (< 0.3) or neither, with the displayed percentage
+    pattern_key = tuple((partner, 'positive' if ratio > 0.7 else 'concerns' if ratio < 0.3 else None, int(ratio * 100))
+                        for partner, ratio in (('male', male_positive_ratio), ('female', female_positive_ratio)))
     
-    # 4.5. PARTNER-SPECIFIC RESPONSE PATTERN ANALYSIS
-    if male_positive_ratio > 0.7:
-        recommendations.append(f"👨 MALE POSITIVE: Male partner shows {int(male_positive_ratio * 100)}% positive responses - excellent engagement and optimism")
-    elif male_positive_ratio < 0.3:
-        recommendations.append(f"👨 MALE CONCERNS: Male partner shows only {int(male_positive_ratio * 100)}% positive responses - individual counseling recommended")
+    # Focus categories above the lowest tier (score > 0.3 / 0.5 / 0.7) as (name, tier, displayed percentage)
+    focus_key = []
+    for category in focus_categories:
+        tier = bisect_left(CATEGORY_FOCUS_THRESHOLDS, category['score'])
+        if tier:
+            focus_key.append((category['name'], tier, int(category['score'] * 100)))
+    return rule_based_recommendation_set(risk_level, (alignment_tier, alignment_pct), optimism_key, conflict_key,
+                                         partner_op, pattern_key, bool(conflict_ratio > 0.4), tuple(focus_key)).to_strings()
+
+@lru_cache(maxsize=4096)
+def rule_based_recommendation_set(risk_level, alignment_key, optimism_key, conflict_key, partner_op, pattern_key,
+                                  crisis_conflict, focus_key):
+    """Memoized rule-based RecommendationSet for one set of (tier, displayed percentage) keys"""
+    # Collect (template key, args) ops; RecommendationSet.to_strings formats them at the edge
+    rec_ops = []
     
-    if female_positive_ratio > 0.7:
-        recommendations.append(f"👩 FEMALE POSITIVE: Female partner shows {int(female_positive_ratio * 100)}% positive responses - excellent engagement and optimism")
-    elif female_positive_ratio < 0.3:
-        recommendations.append(f"👩 FEMALE CONCERNS: Female partner shows only {int(female_positive_ratio * 100)}% positive responses - individual counseling recommended")
+    # 1. ENHANCED PERSONALIZED ALIGNMENT RECOMMENDATIONS
+    alignment_tier, alignment_pct = alignment_key
+    rec_ops.append((ALIGNMENT_TEMPLATE_KEYS[alignment_tier], (alignment_pct,)))
+    
+    # 1.5. COUPLE-SPECIFIC OPTIMISM ANALYSIS
+    optimism_tier, optimism_pct = optimism_key
+    rec_ops.append((OPTIMISM_TEMPLATE_KEYS[optimism_tier], (optimism_pct,)))
+    
+    # 2. DYNAMIC CONFLICT-SPECIFIC RECOMMENDATIONS
+    conflict_tier, conflict_pct = conflict_key
+    rec_ops.append((CONFLICT_TEMPLATE_KEYS[conflict_tier], (conflict_pct,)))
+    
+    # 3. PARTNER-SPECIFIC ANALYSIS (based on average responses)
+    if partner_op is not None:
+        rec_ops.append(partner_op)
+    
+    # 4.5. PARTNER-SPECIFIC RESPONSE PATTERN ANALYSIS (one row per partner, one dispatch site)
+    for partner, pattern, positive_pct in pattern_key:
+        if pattern is not None:
+            rec_ops.append(((partner, pattern), (positive_pct,)))
     
     # 5. DYNAMIC RISK-LEVEL PERSONALIZED RECOMMENDATIONS
     if risk_level == 'High':
-        recommendations.append(f"🔴 HIGH RISK PROFILE: Intensive counseling required - focus on core relationship issues, communication, and conflict resolution")
-        if conflict_ratio > 0.4:
-            recommendations.append(f"💥 CRISIS INTERVENTION: {int(conflict_ratio * 100)}% conflict rate - immediate mediation or specialized counseling required")
+        rec_ops.append(('risk_high', ()))
+        if crisis_conflict:
+            rec_ops.append(('risk_crisis', (conflict_pct,)))
     elif risk_level == 'Medium':
-        recommendations.append(f"🟡 MEDIUM RISK PROFILE: Proactive counseling recommended - address identified issues before they escalate into major problems")
+        rec_ops.append(('risk_medium', ()))
     else:
-        recommendations.append(f"🟢 LOW RISK PROFILE: Preventive counseling - maintain healthy relationship patterns and continue building strong foundations")
+        rec_ops.append(('risk_low', ()))
     
     # 6. DYNAMIC CATEGORY-SPECIFIC PERSONALIZED RECOMMENDATIONS
-    for category in focus_categories:
-        score = category['score']
-        name = category['name']
-        
-        if score > 0.7:
-            if 'Marriage' in name:
-                recommendations.append(f"💕 CRITICAL MARRIAGE FOCUS: {name} at {int(score * 100)}% - immediate relationship foundation counseling required")
-            elif 'Family' in name:
-                recommendations.append(f"👶 CRITICAL FAMILY PLANNING: {name} at {int(score * 100)}% - intensive family planning and parenting preparation needed")
-            elif 'Health' in name:
-                recommendations.append(f"🏥 CRITICAL HEALTH FOCUS: {name} at {int(score * 100)}% - immediate health and wellness counseling required")
-        elif score > 0.5:
-            if 'Marriage' in name:
-                recommendations.append(f"💕 HIGH MARRIAGE PRIORITY: {name} at {int(score * 100)}% - relationship foundation counseling recommended")
-            elif 'Family' in name:
-                recommendations.append(f"👶 HIGH FAMILY PRIORITY: {name} at {int(score * 100)}% - family planning counseling recommended")
-            elif 'Health' in name:
-                recommendations.append(f"🏥 HIGH HEALTH PRIORITY: {name} at {int(score * 100)}% - health and wellness counseling recommended")
-        elif score > 0.3:
-            if 'Marriage' in name:
-                recommendations.append(f"💕 MODERATE MARRIAGE FOCUS: {name} at {int(score * 100)}% - relationship development sessions")
-            elif 'Family' in name:
-                recommendations.append(f"👶 MODERATE FAMILY FOCUS: {name} at {int(score * 100)}% - family planning education")
-            elif 'Health' in name:
-                recommendations.append(f"🏥 MODERATE HEALTH FOCUS: {name} at {int(score * 100)}% - health awareness sessions")
-    
-    
-    return recommendations
+    for name, tier, score_pct in focus_key:
+        # Classify the category once, then look up the (kind, tier) template
+        kind = next((k for k in CATEGORY_FOCUS_KINDS if k in name), None)
+        key = (kind, CATEGORY_FOCUS_TIERS[tier])
+        if key in CATEGORY_FOCUS_TEMPLATES:
+            rec_ops.append((key, (name, score_pct)))
+    
+    return RecommendationSet(tuple(rec_ops))
+
+def batch_score_recommendations(alignment_scores, conflict_ratios, male_responses, female_responses):
+    """Alignment, optimism and conflict recommendations for a batch of couples (1-D feature arrays, (B, Q) responses),
+    tiered with np.digitize over the same thresholds as generate_rule_based_recommendations"""
+    alignment_scores = np.asarray(alignment_scores, dtype=np.float64)
+    conflict_ratios = np.asarray(conflict_ratios, dtype=np.float64)
+    
+    # Positive-response ratios per partner, then the couple's optimism
+    total_responses = male_responses.shape[1]
+    if total_responses > 0:
+        male_positive_ratios = np.count_nonzero(male_responses >= 4, axis=1) / total_responses
+        female_positive_ratios = np.count_nonzero(female_responses >= 4, axis=1) / total_responses
+    else:
+        male_positive_ratios = female_positive_ratios = np.zeros(len(alignment_scores))
+    couple_optimism = (male_positive_ratios + female_positive_ratios) / 2
+    
+    # right=False matches bisect_right (strict '<' ladder), right=True matches bisect_left (strict '>' ladders)
+    alignment_tiers = np.digitize(alignment_scores, ALIGNMENT_THRESHOLDS)
+    optimism_tiers = np.digitize(couple_optimism, OPTIMISM_THRESHOLDS, right=True)
+    conflict_tiers = np.digitize(conflict_ratios, CONFLICT_THRESHOLDS, right=True)
+    
+    # Truncating casts, as int(x * 100) does per couple
+    alignment_pcts = (np.where(alignment_tiers == 1, 1 - alignment_scores, alignment_scores) * 100).astype(np.int64)
+    optimism_pcts = (couple_optimism * 100).astype(np.int64)
+    conflict_pcts = (conflict_ratios * 100).astype(np.int64)
+    
+    # Only the final gather of template strings runs per couple
+    return [
+        [RECOMMENDATION_TEMPLATES[ALIGNMENT_TEMPLATE_KEYS[alignment_tier]] % alignment_pct,
+         RECOMMENDATION_TEMPLATES[OPTIMISM_TEMPLATE_KEYS[optimism_tier]] % optimism_pct,
+         RECOMMENDATION_TEMPLATES[CONFLICT_TEMPLATE_KEYS[conflict_tier]] % conflict_pct]
+        for alignment_tier, alignment_pct, optimism_tier, optimism_pct, conflict_tier, conflict_pct in zip(
+            alignment_tiers.tolist(), alignment_pcts.tolist(), optimism_tiers.tolist(),
+            optimism_pcts.tolist(), conflict_tiers.tolist(), conflict_pcts.tolist()
+        )
+    ]
+
+# NEW: Profile fields read by generate_risk_reasoning (defaults come from PROFILE_DEFAULTS)
+RISK_REASONING_PROFILE_FIELDS = itemgetter('male_age', 'female_age', 'civil_status', 'years_living_together',
+                                           'education_level', 'income_level', 'employment_status')
 
 def generate_risk_reasoning(couple_profile, personalized_features, risk_level, actual_disagree_ratio=None, ml_risk_level=None, actual_risk_level=None):
     """Generate detailed reasoning for risk level based on actual couple features"""
     reasoning_parts = []
     
+    # Relationship dynamics and the percentages shown for them, converted once per call
+    alignment_score = personalized_features.get('alignment_score', 0.5)
+    conflict_ratio = personalized_features.get('conflict_ratio', 0.0)
+    alignment_pct = int(alignment_score * 100)
+    conflict_pct = int(conflict_ratio * 100)
+    disagree_pct = actual_disagree_ratio * 100 if actual_disagree_ratio is not None else None
+    
     # PRIMARY REASONING: Why this risk level?
     if risk_level == 'High':
         reasoning_parts.append("🔴 HIGH RISK CLASSIFICATION:")
         if actual_disagree_ratio and actual_disagree_ratio > 0.35:
-            reasoning_parts.append(f"   • Response Analysis: {actual_disagree_ratio*100:.1f}% weighted disagreement ratio (threshold: >35%)")
+            reasoning_parts.append(f"   • Response Analysis: {disagree_pct:.1f}% weighted disagreement ratio (threshold: >35%)")
             reasoning_parts.append(f"   • This indicates significant disagreements across multiple MEAI categories")
         reasoning_parts.append("   • Requires immediate, intensive counseling intervention")
     elif risk_level == 'Medium':
         reasoning_parts.append("🟡 MEDIUM RISK CLASSIFICATION:")
         if actual_disagree_ratio and 0.20 < actual_disagree_ratio <= 0.35:
-            reasoning_parts.append(f"   • Response Analysis: {actual_disagree_ratio*100:.1f}% weighted disagreement ratio (threshold: 20-35%)")
+            reasoning_parts.append(f"   • Response Analysis: {disagree_pct:.1f}% weighted disagreement ratio (threshold: 20-35%)")
             reasoning_parts.append(f"   • This indicates moderate concerns requiring proactive attention")
         reasoning_parts.append("   • Proactive counseling recommended to address identified issues")
     else:  # Low
         reasoning_parts.append("🟢 LOW RISK CLASSIFICATION:")
         if actual_disagree_ratio and actual_disagree_ratio <= 0.20:
-            reasoning_parts.append(f"   • Response Analysis: {actual_disagree_ratio*100:.1f}% weighted disagreement ratio (threshold: ≤20%)")
+            reasoning_parts.append(f"   • Response Analysis: {disagree_pct:.1f}% weighted disagreement ratio (threshold: ≤20%)")
             reasoning_parts.append(f"   • This indicates healthy relationship with minimal disagreements")
         reasoning_parts.append("   • Preventive counseling recommended to maintain relationship health")
     
@@ -2748,10 +3271,8 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
             reasoning_parts.append(f"\n📊 DECISION SOURCE: Hybrid Analysis (Methods Disagree)")
             reasoning_parts.append(f"   • Response-Based Calculation: {actual_risk_level} Risk")
             if actual_disagree_ratio is not None:
-                reasoning_parts.append(f"     → Disagreement ratio: {actual_disagree_ratio*100:.1f}%")
-            alignment_score = personalized_features.get('alignment_score', 0.5)
-            conflict_ratio = personalized_features.get('conflict_ratio', 0.0)
-            reasoning_parts.append(f"     → Alignment: {int(alignment_score * 100)}%, Conflict: {int(conflict_ratio * 100)}%")
+                reasoning_parts.append(f"     → Disagreement ratio: {disagree_pct:.1f}%")
+            reasoning_parts.append(f"     → Alignment: {alignment_pct}%, Conflict: {conflict_pct}%")
             reasoning_parts.append(f"   • ML Model Prediction: {ml_risk_level} Risk")
             reasoning_parts.append(f"     → Based on demographic patterns and learned relationships")
             reasoning_parts.append(f"   • Final Decision: {risk_level} Risk")
@@ -2768,10 +3289,14 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     # DEMOGRAPHIC FACTORS ANALYSIS
     reasoning_parts.append("\n👥 DEMOGRAPHIC FACTORS:")
     
-    # Age difference analysis
-    male_age = couple_profile.get('male_age', 30)
-    female_age = couple_profile.get('female_age', 30)
-    age_gap = abs(male_age - female_age)
+    # Profile fields in one lookup over the submitted profile layered on the defaults
+    (male_age, female_age, civil_status, years_together,
+     education_level, income_level, employment_status) = RISK_REASONING_PROFILE_FIELDS(ChainMap(couple_profile, PROFILE_DEFAULTS))
+    
+    # Age difference analysis (sign flip instead of a builtins.abs lookup and call)
+    age_gap = male_age - female_age
+    if age_gap < 0:
+        age_gap = -age_gap
     
     if age_gap > 10:
         reasoning_parts.append(f"   • ⚠️ Significant age gap: {age_gap} years (Male: {male_age}, Female: {female_age})")
@@ -2784,9 +3309,7 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
         reasoning_parts.append(f"   • ✅ Minimal age gap: {age_gap} years (similar life stages)")
     
     # Civil status analysis
-    civil_status = couple_profile.get('civil_status', 'Single')
     if civil_status == 'Living In':
-        years_together = couple_profile.get('years_living_together', 0)
         if years_together > 5:
             reasoning_parts.append(f"   • Long-term cohabitation: {years_together} years")
             reasoning_parts.append(f"     → Established relationship patterns, may have unresolved issues")
@@ -2802,9 +3325,9 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
         reasoning_parts.append(f"   • ✅ Single status: No previous relationship complications")
     
     # Education and income compatibility
-    education_level = couple_profile.get('education_level', 2)
-    income_level = couple_profile.get('income_level', 2)
-    education_income_diff = abs(education_level - income_level)
+    education_income_diff = education_level - income_level
+    if education_income_diff < 0:
+        education_income_diff = -education_income_diff
     
     if education_income_diff > 2:
         reasoning_parts.append(f"   • ⚠️ Education-Income Mismatch: {education_income_diff} level difference")
@@ -2818,7 +3341,6 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
         reasoning_parts.append(f"   • ✅ Compatible education-income levels: Similar socioeconomic status")
     
     # Employment status
-    employment_status = couple_profile.get('employment_status', 'Unemployed')
     if employment_status == 'Unemployed':
         reasoning_parts.append(f"   • ⚠️ Employment Status: {employment_status}")
         reasoning_parts.append(f"     → Unemployment may contribute to financial stress and relationship challenges")
@@ -2830,17 +3352,13 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     # RESPONSE-BASED FACTORS ANALYSIS
     reasoning_parts.append("\n💬 RESPONSE-BASED FACTORS:")
     
-    # Relationship dynamics analysis
-    alignment_score = personalized_features.get('alignment_score', 0.5)
-    conflict_ratio = personalized_features.get('conflict_ratio', 0.0)
-    
     # Detect conflicts between risk level and response-based indicators
     has_conflict = False
     if risk_level == 'High' and alignment_score > 0.7 and conflict_ratio < 0.15:
         has_conflict = True
         reasoning_parts.append(f"   ⚠️ CONFLICT DETECTED: High Risk classification despite positive response indicators")
-        reasoning_parts.append(f"   • ✅ High Alignment: {int(alignment_score * 100)}% agreement between partners")
-        reasoning_parts.append(f"   • ✅ Low Conflict: {int(conflict_ratio * 100)}% disagreement rate")
+        reasoning_parts.append(f"   • ✅ High Alignment: {alignment_pct}% agreement between partners")
+        reasoning_parts.append(f"   • ✅ Low Conflict: {conflict_pct}% disagreement rate")
         reasoning_parts.append(f"   • Response-based calculation suggests: Low Risk")
         if ml_risk_level and ml_risk_level == 'High' and actual_risk_level and actual_risk_level == 'Low':
             reasoning_parts.append(f"   • ML Model Prediction: High Risk (based on demographic patterns)")
@@ -2851,8 +3369,8 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     elif risk_level == 'Low' and alignment_score < 0.4 and conflict_ratio > 0.3:
         has_conflict = True
         reasoning_parts.append(f"   ⚠️ CONFLICT DETECTED: Low Risk classification despite concerning response indicators")
-        reasoning_parts.append(f"   • ⚠️ Low Alignment: {int(alignment_score * 100)}% agreement between partners")
-        reasoning_parts.append(f"   • ⚠️ High Conflict: {int(conflict_ratio * 100)}% disagreement rate")
+        reasoning_parts.append(f"   • ⚠️ Low Alignment: {alignment_pct}% agreement between partners")
+        reasoning_parts.append(f"   • ⚠️ High Conflict: {conflict_pct}% disagreement rate")
         reasoning_parts.append(f"   • Response-based calculation suggests: High Risk")
         if ml_risk_level and ml_risk_level == 'Low' and actual_risk_level and actual_risk_level == 'High':
             reasoning_parts.append(f"   • ML Model Prediction: Low Risk (based on demographic patterns)")
@@ -2863,29 +3381,29 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     if not has_conflict:
         # Normal display without conflict
         if alignment_score > 0.7:
-            reasoning_parts.append(f"   • ✅ High Alignment: {int(alignment_score * 100)}% agreement between partners")
+            reasoning_parts.append(f"   • ✅ High Alignment: {alignment_pct}% agreement between partners")
             reasoning_parts.append(f"     → Partners share similar values and perspectives")
             if risk_level == 'Low':
                 reasoning_parts.append(f"     → This strong alignment supports Low Risk classification")
         elif alignment_score < 0.4:
-            reasoning_parts.append(f"   • ⚠️ Low Alignment: {int(alignment_score * 100)}% agreement between partners")
+            reasoning_parts.append(f"   • ⚠️ Low Alignment: {alignment_pct}% agreement between partners")
             reasoning_parts.append(f"     → Significant differences in values and perspectives")
             if risk_level in ['Medium', 'High']:
                 reasoning_parts.append(f"     → This low alignment contributes to {risk_level} Risk classification")
         else:
-            reasoning_parts.append(f"   • Moderate Alignment: {int(alignment_score * 100)}% agreement")
+            reasoning_parts.append(f"   • Moderate Alignment: {alignment_pct}% agreement")
             reasoning_parts.append(f"     → Some areas of agreement, some areas of difference")
         
         if conflict_ratio > 0.3:
-            reasoning_parts.append(f"   • ⚠️ High Conflict: {int(conflict_ratio * 100)}% disagreement rate")
+            reasoning_parts.append(f"   • ⚠️ High Conflict: {conflict_pct}% disagreement rate")
             reasoning_parts.append(f"     → Frequent disagreements between partners")
             if risk_level in ['Medium', 'High']:
                 reasoning_parts.append(f"     → This high conflict rate is a primary factor for {risk_level} Risk")
         elif conflict_ratio > 0.1:
-            reasoning_parts.append(f"   • Moderate Conflict: {int(conflict_ratio * 100)}% disagreement rate")
+            reasoning_parts.append(f"   • Moderate Conflict: {conflict_pct}% disagreement rate")
             reasoning_parts.append(f"     → Some disagreements, manageable with communication skills")
         else:
-            reasoning_parts.append(f"   • ✅ Low Conflict: {int(conflict_ratio * 100)}% disagreement rate")
+            reasoning_parts.append(f"   • ✅ Low Conflict: {conflict_pct}% disagreement rate")
             reasoning_parts.append(f"     → Minimal disagreements, healthy communication patterns")
             if risk_level == 'Low':
                 reasoning_parts.append(f"     → This low conflict supports Low Risk classification")
@@ -2895,20 +3413,19 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     if len(category_alignments) >= 4 and MEAI_CATEGORIES:
         reasoning_parts.append("\n📋 MEAI CATEGORY ANALYSIS:")
         for i, (category, alignment) in enumerate(zip(MEAI_CATEGORIES, category_alignments)):
+            category_pct = int(alignment * 100)
             if alignment < 0.4:
-                reasoning_parts.append(f"   • ⚠️ {category}: {int(alignment * 100)}% alignment (Low - needs attention)")
+                reasoning_parts.append(f"   • ⚠️ {category}: {category_pct}% alignment (Low - needs attention)")
             elif alignment > 0.7:
-                reasoning_parts.append(f"   • ✅ {category}: {int(alignment * 100)}% alignment (High - strong agreement)")
+                reasoning_parts.append(f"   • ✅ {category}: {category_pct}% alignment (High - strong agreement)")
             else:
-                reasoning_parts.append(f"   • {category}: {int(alignment * 100)}% alignment (Moderate)")
+                reasoning_parts.append(f"   • {category}: {category_pct}% alignment (Moderate)")
     
     # SUMMARY
     reasoning_parts.append(f"\n📝 SUMMARY:")
-    disagree_ratio_text = f"{actual_disagree_ratio*100:.1f}%" if actual_disagree_ratio is not None else "calculated from responses"
+    disagree_ratio_text = f"{disagree_pct:.1f}%" if actual_disagree_ratio is not None else "calculated from responses"
     
     # Check for conflicts to provide clearer summary
-    alignment_score = personalized_features.get('alignment_score', 0.5)
-    conflict_ratio = personalized_features.get('conflict_ratio', 0.0)
     has_conflict_summary = False
     if risk_level == 'High' and alignment_score > 0.7 and conflict_ratio < 0.15:
         has_conflict_summary = True
@@ -2919,7 +3436,7 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
         reasoning_parts.append(f"   The {risk_level} Risk classification is based on:")
         if has_conflict_summary:
             reasoning_parts.append(f"   • ⚠️ ML Model Prediction (demographic-based) overrides response-based calculation")
-            reasoning_parts.append(f"   • Despite good alignment ({int(alignment_score * 100)}%) and low conflict ({int(conflict_ratio * 100)}%),")
+            reasoning_parts.append(f"   • Despite good alignment ({alignment_pct}%) and low conflict ({conflict_pct}%),")
             reasoning_parts.append(f"     demographic factors indicate potential relationship challenges")
             if actual_disagree_ratio is not None and actual_disagree_ratio <= 0.20:
                 reasoning_parts.append(f"   • Response-based calculation: Low Risk ({disagree_ratio_text} disagreement)")
@@ -2942,7 +3459,7 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
         if has_conflict_summary:
             reasoning_parts.append(f"   • ⚠️ Response-based calculation (high alignment/low conflict) overrides ML prediction")
             reasoning_parts.append(f"   • Despite concerning demographic factors, current relationship indicators")
-            reasoning_parts.append(f"     (alignment: {int(alignment_score * 100)}%, conflict: {int(conflict_ratio * 100)}%) show healthy patterns")
+            reasoning_parts.append(f"     (alignment: {alignment_pct}%, conflict: {conflict_pct}%) show healthy patterns")
             if actual_disagree_ratio is not None:
                 reasoning_parts.append(f"   • Low disagreement ratio: {disagree_ratio_text} (threshold: ≤20%)")
             reasoning_parts.append(f"   • Note: Monitor relationship as demographic factors may still pose challenges")
@@ -2954,56 +3471,84 @@ def generate_risk_reasoning(couple_profile, personalized_features, risk_level, a
     
     return "\n".join(reasoning_parts)
 
+# NEW: Counseling reasoning %-format templates (priority buckets high/moderate/low, confidence tiers low to high)
+COUNSELING_PRIORITY_TEMPLATES = ("Critical needs in: %s", "Development areas in: %s", "Strong areas in: %s")
+COUNSELING_CONFIDENCE_THRESHOLDS = (0.3, 0.6)
+COUNSELING_CONFIDENCE_TEMPLATES = (
+    "Conservative confidence (%d%%) in assessment accuracy",
+    "Moderate confidence (%d%%) in assessment accuracy",
+    "High confidence (%d%%) in assessment accuracy",
+)
+COUNSELING_REASONING_TEMPLATE = "Counseling recommendation based on: %s"
+COUNSELING_REASONING_MAX_PARTS = 3
+
 def generate_counseling_reasoning(focus_categories, category_scores, ml_confidence):
     """Generate specific reasoning for counseling recommendation based on MEAI categories"""
+    # (template, args) parts, substituted while joining the final string
     reasoning_parts = []
     
-    # Analyze specific MEAI categories
-    high_priority_categories = [cat for cat in focus_categories if cat['score'] > 0.6]
-    moderate_priority_categories = [cat for cat in focus_categories if 0.3 < cat['score'] <= 0.6]
-    low_priority_categories = [cat for cat in focus_categories if cat['score'] <= 0.3]
+    # Analyze specific MEAI categories: bucket indices with one pass of vectorized compares
+    # (float64 so the 0.3/0.6 boundaries compare exactly as the scores themselves do)
+    scores = np.fromiter((cat['score'] for cat in focus_categories), dtype=np.float64, count=len(focus_categories))
+    high_priority_indices = np.flatnonzero(scores > 0.6)
+    moderate_priority_indices = np.flatnonzero((scores > 0.3) & (scores <= 0.6))
+    low_priority_indices = np.flatnonzero(scores <= 0.3)
     
-    if high_priority_categories:
-        category_names = [cat['name'] for cat in high_priority_categories]
-        reasoning_parts.append(f"Critical needs in: {', '.join(category_names[:2])}")
+    for template, indices in zip(COUNSELING_PRIORITY_TEMPLATES, (high_priority_indices, moderate_priority_indices, low_priority_indices)):
+        if indices.size:
+            reasoning_parts.append((template, (', '.join([focus_categories[i]['name'] for i in indices[:2]]),)))
     
-    if moderate_priority_categories:
-        category_names = [cat['name'] for cat in moderate_priority_categories]
-        reasoning_parts.append(f"Development areas in: {', '.join(category_names[:2])}")
-    
-    if low_priority_categories:
-        category_names = [cat['name'] for cat in low_priority_categories]
-        reasoning_parts.append(f"Strong areas in: {', '.join(category_names[:2])}")
-    
-    # Add confidence-based reasoning
-    if ml_confidence > 0.6:
-        reasoning_parts.append(f"High confidence ({int(ml_confidence * 100)}%) in assessment accuracy")
-    elif ml_confidence > 0.3:
-        reasoning_parts.append(f"Moderate confidence ({int(ml_confidence * 100)}%) in assessment accuracy")
-    else:
-        reasoning_parts.append(f"Conservative confidence ({int(ml_confidence * 100)}%) in assessment accuracy")
+    # Add confidence-based reasoning (confidence > 0.3 / 0.6), only formatted when it still fits in the summary
+    if len(reasoning_parts) < COUNSELING_REASONING_MAX_PARTS:
+        reasoning_parts.append((COUNSELING_CONFIDENCE_TEMPLATES[bisect_left(COUNSELING_CONFIDENCE_THRESHOLDS, ml_confidence)], (int(ml_confidence * 100),)))
     
-    # Combine reasoning
-    if len(reasoning_parts) > 3:
-        return f"Counseling recommendation based on: {'; '.join(reasoning_parts[:3])}"
-    else:
-        return f"Counseling recommendation based on: {'; '.join(reasoning_parts)}"
+    # Combine reasoning in one join
+    return COUNSELING_REASONING_TEMPLATE % '; '.join([template % args for template, args in reasoning_parts])
+
+def reset_db_pool_after_fork(server, worker):
+    """gunicorn post_fork hook: the worker opens its own pooled connections instead of sharing the master's sockets"""
+    global db_pool
+    db_pool = None
+
+if GUNICORN_AVAILABLE:
+    class ServiceApplication(BaseApplication):
+        """Embedded gunicorn server for the already-loaded Flask app (the worker forks with models in memory)"""
+        
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+        
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return self.application
 
 if __name__ == '__main__':
-    print("Starting Counseling Topics Service...")
-    
-    # Load MEAI categories from database
-    load_categories_from_db()
-    print(f"MEAI Categories: {MEAI_CATEGORIES}")
-    
-    # Load MEAI questions and sub-questions from database
-    load_questions_from_db()
-    
-    # Load existing models if available
-    load_ml_models()
-    
-    print("Service ready!")
-    print("Counseling Topics Models: Available" if all(model is not None for model in ml_models.values()) else "Counseling Topics Models: Training needed")
-    print(f"Analysis Method: Random Forest Counseling Topics with {len(MEAI_CATEGORIES)} MEAI categories")
-    
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    # Startup messages go through logging so arguments are only formatted at enabled levels (LOG_LEVEL, default INFO)
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
+    logger.info("Starting Counseling Topics Service...")
+    
+    # Load MEAI categories, questions and existing models (DB and model file loads overlap)
+    warm_up_service()
+    logger.debug("MEAI Categories: %s", MEAI_CATEGORIES)
+    
+    logger.info("Service ready!")
+    logger.info("Counseling Topics Models: %s", "Available" if MODELS_READY else "Training needed")
+    logger.info("Analysis Method: Random Forest Counseling Topics with %d MEAI categories", len(MEAI_CATEGORIES))
+    
+    # gunicorn unless debugging (FLASK_DEBUG=1) or gunicorn is unavailable (e.g. Windows).
+    # One worker process: training status, loaded models and the prediction caches are per-process state,
+    # so /train and /training_status must reach the same process; concurrency comes from gthread threads.
+    if GUNICORN_AVAILABLE and os.environ.get('FLASK_DEBUG', '0') != '1':
+        ServiceApplication(app, {
+            'bind': '127.0.0.1:5000',
+            'workers': 1,
+            'worker_class': 'gthread',
+            'threads': 4,
+            'post_fork': reset_db_pool_after_fork
+        }).run()
+    else:
+        app.run(host='127.0.0.1', port=5000, debug=True)
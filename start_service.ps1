@@ -32,7 +32,7 @@ if (-not (Test-Path "service.py")) {
 # Check dependencies
 Write-Host "" 
 Write-Host "Checking dependencies..." -ForegroundColor Yellow
-& "$pythonExePath" -c "import flask, flask_cors, numpy, pandas, sklearn, requests"
+& "$pythonExePath" -c "import flask, flask_cors, numpy, sklearn, requests"
 if ($LASTEXITCODE -ne 0) {
     Write-Host "[WARNING] Missing dependencies detected. Installing..." -ForegroundColor Yellow
     & "$pythonExePath" -m pip install --upgrade pip
@@ -0,0 +1,40 @@
+"""ONNX export of the category and risk models"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingClassifier
+
+import service
+
+pytestmark = pytest.mark.skipif(not service.ONNX_AVAILABLE, reason="onnxruntime/skl2onnx not installed")
+
+@pytest.fixture
+def fitted_models(monkeypatch):
+    """Small multi-output category forest and 3-class risk model installed in service.ml_models"""
+    rng = np.random.RandomState(0)
+    X = rng.rand(120, 10).astype(np.float32)
+    category_model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, rng.rand(120, 4))
+    risk_model = HistGradientBoostingClassifier(max_iter=5).fit(X, rng.randint(0, 3, 120))
+    monkeypatch.setitem(service.ml_models, 'category_model', category_model)
+    monkeypatch.setitem(service.ml_models, 'risk_model', risk_model)
+    for name in service.onnx_sessions:
+        monkeypatch.setitem(service.onnx_sessions, name, None)
+    return X, category_model
+
+def test_category_session_outputs_every_category(tmp_path, fitted_models):
+    X, category_model = fitted_models
+    assert service.load_onnx_sessions(str(tmp_path), force_export=True)
+    
+    session = service.onnx_sessions['category_model']
+    assert session.get_outputs()[0].shape == [None, 4]
+    scores = session.run(None, {'X': X[:3]})[0]
+    assert scores.shape == (3, 4)
+    np.testing.assert_allclose(scores, category_model.predict(X[:3]), rtol=1e-5, atol=1e-5)
+
+def test_category_file_with_single_output_is_exported_again(tmp_path, fitted_models):
+    X, category_model = fitted_models
+    # A file written before the output width was declared
+    onx = service.convert_sklearn(category_model, initial_types=[('X', service.FloatTensorType([None, X.shape[1]]))])
+    (tmp_path / 'category_model.onnx').write_bytes(onx.SerializeToString())
+    
+    assert service.load_onnx_sessions(str(tmp_path))
+    assert service.onnx_sessions['category_model'].get_outputs()[0].shape == [None, 4]
@@ -0,0 +1,39 @@
+"""Personalized features and response-code validation"""
+import pytest
+
+import service
+
+QUESTION_COUNT = 4
+
+@pytest.fixture
+def question_structure(monkeypatch):
+    """Four standalone questions, one per category, so no database is needed"""
+    monkeypatch.setattr(service, 'MEAI_CATEGORIES', ['Marriage And Relationship', 'Responsible Parenthood',
+                                                     'Planning The Family', 'Maternal Neonatal Child Health And Nutrition'])
+    monkeypatch.setattr(service, 'MEAI_QUESTIONS', {cid: {cid: {'text': 'q', 'sub_questions': []}} for cid in range(1, 5)})
+    monkeypatch.setattr(service, 'MEAI_QUESTION_MAPPING', {qid: qid for qid in range(1, QUESTION_COUNT + 1)})
+    service.build_question_index()
+    yield
+    monkeypatch.undo()
+    service.build_question_index()
+
+@pytest.mark.parametrize('use_numba', [True, False])
+def test_conflict_ratio_covers_the_full_response_scale(question_structure, monkeypatch, use_numba):
+    if use_numba and not service.NUMBA_AVAILABLE:
+        pytest.skip("numba not installed")
+    monkeypatch.setattr(service, 'NUMBA_AVAILABLE', use_numba)
+    # Strongly agree next to agree is a minor (0.5) conflict, strongly disagree next to neutral a major one plus a neutral
+    features = service.calculate_personalized_features_flask([], [5, 1, 5, 4], [4, 3, 5, 4])
+    assert features['conflict_ratio'] == pytest.approx((0.5 + 1.0 + 0.3) / 4)
+    assert features['alignment_score'] == pytest.approx((3 / 4 + 2 / 4 + 1 + 1) / 4)
+
+@pytest.mark.parametrize('code', [0, 6, 2.5, None])
+def test_analyze_rejects_out_of_range_response_codes(question_structure, code):
+    male_responses = [3] * QUESTION_COUNT
+    male_responses[2] = code
+    response = service.app.test_client().post('/analyze', json={
+        'male_responses': male_responses,
+        'female_responses': [3] * QUESTION_COUNT,
+    })
+    assert response.status_code == 400
+    assert 'male_responses[2]' in response.get_json()['message']